@@ -1,53 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import Optional
-import structlog
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Dict, Any
+import msgspec
+import logging
 
 from app.database.database import get_db
 from app.database.models import User
-from app.api.auth import get_current_user
-from app.core.redis_client import get_analysis_progress
-from app.services.analysis_service import get_game_analysis
+from app.api.auth import get_current_user, get_current_user_claims
+from app.core.redis_async import aget_analysis_progress
+from app.core.responses import MsgspecJSONResponse
+from app.services.analysis_service import get_game_analysis, get_game_analysis_summary, get_game_analysis_moves
 
-logger = structlog.get_logger()
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-class AnalysisStatus(BaseModel):
+# Polled every few seconds by the frontend, so encoded with msgspec
+# rather than validated through a Pydantic response model
+class AnalysisStatus(msgspec.Struct, frozen=True):
     games_total: int
     games_completed: int
     games_failed: int
     percentage: float
     status: str
-    estimated_completion: Optional[str] = None
     is_complete: bool
+    estimated_completion: Optional[str] = None
 
 
-@router.get("/status", response_model=AnalysisStatus)
-async def get_analysis_status(current_user: User = Depends(get_current_user)):
+@router.get("/status", response_class=MsgspecJSONResponse, response_model=None)
+async def get_analysis_status(current_user: Dict[str, Any] = Depends(get_current_user_claims)):
     """Get current analysis progress"""
     try:
-        progress = get_analysis_progress(current_user.id)
+        progress = await aget_analysis_progress(current_user['user_id'])
         
         if not progress:
-            return AnalysisStatus(
+            return MsgspecJSONResponse(AnalysisStatus(
                 games_total=0,
                 games_completed=0,
                 games_failed=0,
-                percentage=0,
+                percentage=0.0,
                 status="no_analysis_running",
                 is_complete=True
-            )
+            ))
         
         games_total = progress.get('games_total', 0)
         games_completed = progress.get('games_completed', 0)
         games_failed = progress.get('games_failed', 0)
         percentage = progress.get('percentage', 0)
-        status = progress.get('status', 'unknown')
+        progress_status = progress.get('status', 'unknown')
         
         # Calculate completion
-        is_complete = percentage >= 100 or status == 'completed'
+        is_complete = percentage >= 100 or progress_status == 'completed'
         
         # Estimate completion time
         estimated_completion = None
@@ -56,18 +59,18 @@ async def get_analysis_status(current_user: User = Depends(get_current_user)):
             estimated_minutes = int((100 - percentage) * 2)  # Rough estimate
             estimated_completion = f"{estimated_minutes} minutes"
         
-        return AnalysisStatus(
+        return MsgspecJSONResponse(AnalysisStatus(
             games_total=games_total,
             games_completed=games_completed,
             games_failed=games_failed,
             percentage=round(percentage, 1),
-            status=status,
+            status=progress_status,
             estimated_completion=estimated_completion,
             is_complete=is_complete
-        )
+        ))
         
     except Exception as e:
-        logger.error(f"Failed to get analysis status for user {current_user.id}", error=str(e))
+        logger.error("Failed to get analysis status", extra={"user_id": current_user['user_id'], "error": str(e)})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to get analysis status"
@@ -78,7 +81,7 @@ async def get_analysis_status(current_user: User = Depends(get_current_user)):
 async def get_game_analysis_endpoint(
     game_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get detailed analysis for a specific game"""
     try:
@@ -95,8 +98,66 @@ async def get_game_analysis_endpoint(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to get game analysis for game {game_id}", error=str(e))
+        logger.error("Failed to get game analysis", extra={"game_id": game_id, "error": str(e)})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to get game analysis"
         )
+
+
+@router.get("/games/{game_id}/summary")
+async def get_game_analysis_summary_endpoint(
+    game_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get summary statistics for a game's analysis"""
+    try:
+        summary = await get_game_analysis_summary(game_id, current_user.id, db)
+        
+        if not summary:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Game not found or not analyzed"
+            )
+        
+        return summary
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to get game analysis summary", extra={"game_id": game_id, "error": str(e)})
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to get game analysis summary"
+        )
+
+
+@router.get("/games/{game_id}/moves")
+async def get_game_analysis_moves_endpoint(
+    game_id: int,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get a page of per-move analysis for a game"""
+    try:
+        moves = await get_game_analysis_moves(game_id, current_user.id, db, offset, limit)
+        
+        if moves is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Game not found or not analyzed"
+            )
+        
+        return {"moves": moves, "offset": offset, "limit": limit}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to get game analysis moves", extra={"game_id": game_id, "error": str(e)})
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to get game analysis moves"
+        )
@@ -1,33 +1,49 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from pydantic import BaseModel, EmailStr
-from typing import Optional
-import structlog
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import bindparam, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, ConfigDict, EmailStr
+from typing import Optional, Dict, Any
+from datetime import datetime
+import hashlib
+import logging
 
 from app.database.database import get_db
 from app.database.models import User
-from app.core.security import verify_password, get_password_hash, create_access_token, get_current_user_from_token
+from app.core.security import verify_and_update_password, get_password_hash, create_access_token, get_current_user_from_token
+from app.core.redis_async import aget_cache, aset_cache
 from app.services.lichess_service import fetch_user_games_task
 
-logger = structlog.get_logger()
+logger = logging.getLogger(__name__)
 router = APIRouter()
-security = HTTPBearer()
+
+# Seconds a resolved user stays cached against its token
+USER_CACHE_TTL = 60
+
+# User lookups, built once and reused with bound parameters
+_USER_BY_ID = select(User).where(User.id == bindparam("user_id"))
+_USER_BY_EMAIL = select(User).where(User.email == bindparam("email"))
 
 
 # Pydantic models
 class UserRegistration(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     email: EmailStr
     lichess_username: str
     password: str
 
 
 class UserLogin(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     email: EmailStr
     password: str
 
 
 class AuthResponse(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     access_token: str
     token_type: str
     user_id: int
@@ -35,6 +51,8 @@ class AuthResponse(BaseModel):
 
 
 class UserProfile(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     id: int
     email: str
     lichess_username: Optional[str]
@@ -42,21 +60,93 @@ class UserProfile(BaseModel):
     created_at: str
 
 
-# Dependency to get current user
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user"""
-    user_data = get_current_user_from_token(credentials.credentials)
+def _user_cache_key(token: str) -> str:
+    """Build the Redis key caching the user resolved from a token"""
+    return "auth:" + hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+
+
+def _user_to_cache(user: User) -> Dict[str, Any]:
+    """Serialize the user columns needed by API endpoints"""
+    return {
+        "id": user.id,
+        "email": user.email,
+        "lichess_username": user.lichess_username,
+        "subscription_tier": user.subscription_tier,
+        "is_active": user.is_active,
+        "created_at": user.created_at.isoformat() if user.created_at else None,
+    }
+
+
+def _user_from_cache(data: Dict[str, Any]) -> User:
+    """Rebuild a detached User from its cached columns"""
+    created_at = data.get("created_at")
+    return User(
+        id=data["id"],
+        email=data["email"],
+        lichess_username=data.get("lichess_username"),
+        subscription_tier=data.get("subscription_tier"),
+        is_active=data.get("is_active"),
+        created_at=datetime.fromisoformat(created_at) if created_at else None,
+    )
+
+
+def _token_data(user: User) -> Dict[str, Any]:
+    """Build the JWT claims for a user"""
+    return {
+        "user_id": user.id,
+        "email": user.email,
+        "lichess_username": user.lichess_username,
+        "subscription_tier": user.subscription_tier,
+        "created_at": user.created_at.isoformat() if user.created_at else None
+    }
+
+
+def _bearer_token(request: Request) -> str:
+    """Extract the bearer token from the Authorization header"""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return token
+
+
+def _decode_claims(token: str) -> Dict[str, Any]:
+    """Decode token claims or reject the request"""
+    user_data = get_current_user_from_token(token)
     if not user_data:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return user_data
+
+
+# Dependency to get current user claims without a database lookup
+async def get_current_user_claims(request: Request) -> Dict[str, Any]:
+    """Get current authenticated user's token claims"""
+    return _decode_claims(_bearer_token(request))
+
+
+# Dependency to get current user
+async def get_current_user(
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """Get current authenticated user"""
+    token = _bearer_token(request)
+    user_data = _decode_claims(token)
+    
+    cache_key = _user_cache_key(token)
+    cached_user = await aget_cache(cache_key)
+    if cached_user:
+        return _user_from_cache(cached_user)
     
-    user = db.query(User).filter(User.id == user_data["user_id"]).first()
+    result = await db.execute(_USER_BY_ID, {"user_id": user_data["user_id"]})
+    user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -64,18 +154,21 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    await aset_cache(cache_key, _user_to_cache(user), expire=USER_CACHE_TTL)
     return user
 
 
 @router.post("/register", response_model=AuthResponse)
 async def register(
     user_data: UserRegistration,
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db)
 ):
     """Register a new user and start game analysis"""
     try:
         # Check if user already exists
-        existing_user = db.query(User).filter(User.email == user_data.email).first()
+        result = await db.execute(_USER_BY_EMAIL, {"email": user_data.email})
+        existing_user = result.scalar_one_or_none()
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -83,29 +176,30 @@ async def register(
             )
         
         # Create new user
-        hashed_password = get_password_hash(user_data.password)
-        new_user = User(
+        hashed_password = await run_in_threadpool(get_password_hash, user_data.password)
+        stmt = insert(User).values(
             email=user_data.email,
             lichess_username=user_data.lichess_username,
             password_hash=hashed_password
-        )
+        ).returning(User.id, User.subscription_tier, User.created_at)
+        row = (await db.execute(stmt)).one()
+        await db.commit()
         
-        db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        new_user = User(
+            id=row.id,
+            email=user_data.email,
+            lichess_username=user_data.lichess_username,
+            subscription_tier=row.subscription_tier,
+            created_at=row.created_at
+        )
         
         # Create access token
-        token_data = {
-            "user_id": new_user.id,
-            "email": new_user.email,
-            "lichess_username": new_user.lichess_username
-        }
-        access_token = create_access_token(data=token_data)
+        access_token = create_access_token(data=_token_data(new_user))
         
-        # Start background game fetching
-        fetch_user_games_task.delay(new_user.id, user_data.lichess_username)
+        # Start background game fetching once the response has been sent
+        background_tasks.add_task(fetch_user_games_task.delay, new_user.id, user_data.lichess_username)
         
-        logger.info("User registered successfully", user_id=new_user.id, email=user_data.email)
+        logger.info("User registered successfully", extra={"user_id": new_user.id, "email": user_data.email})
         
         return AuthResponse(
             access_token=access_token,
@@ -117,7 +211,7 @@ async def register(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error("Registration failed", error=str(e), email=user_data.email)
+        logger.error("Registration failed", extra={"error": str(e), "email": user_data.email})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Registration failed. Please try again."
@@ -127,12 +221,13 @@ async def register(
 @router.post("/login", response_model=AuthResponse)
 async def login(
     user_data: UserLogin,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Authenticate user and return token"""
     try:
         # Find user by email
-        user = db.query(User).filter(User.email == user_data.email).first()
+        result = await db.execute(_USER_BY_EMAIL, {"email": user_data.email})
+        user = result.scalar_one_or_none()
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -140,21 +235,24 @@ async def login(
             )
         
         # Verify password
-        if not verify_password(user_data.password, user.password_hash):
+        verified, new_hash = await run_in_threadpool(
+            verify_and_update_password, user_data.password, user.password_hash
+        )
+        if not verified:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid email or password"
             )
         
+        # Transparently upgrade legacy bcrypt hashes
+        if new_hash:
+            user.password_hash = new_hash
+            await db.commit()
+        
         # Create access token
-        token_data = {
-            "user_id": user.id,
-            "email": user.email,
-            "lichess_username": user.lichess_username
-        }
-        access_token = create_access_token(data=token_data)
+        access_token = create_access_token(data=_token_data(user))
         
-        logger.info("User logged in successfully", user_id=user.id, email=user.email)
+        logger.info("User logged in successfully", extra={"user_id": user.id, "email": user.email})
         
         return AuthResponse(
             access_token=access_token,
@@ -165,7 +263,7 @@ async def login(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error("Login failed", error=str(e), email=user_data.email)
+        logger.error("Login failed", extra={"error": str(e), "email": user_data.email})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Login failed. Please try again."
@@ -173,19 +271,37 @@ async def login(
 
 
 @router.get("/profile", response_model=UserProfile)
-async def get_profile(current_user: User = Depends(get_current_user)):
+async def get_profile(
+    current_user: Dict[str, Any] = Depends(get_current_user_claims),
+    db: AsyncSession = Depends(get_db)
+):
     """Get current user profile"""
+    if current_user["subscription_tier"] is None or current_user["created_at"] is None:
+        # Tokens issued before profile claims were added need the database
+        result = await db.execute(_USER_BY_ID, {"user_id": current_user["user_id"]})
+        user = result.scalar_one_or_none()
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        current_user = _token_data(user)
+    
     return UserProfile(
-        id=current_user.id,
-        email=current_user.email,
-        lichess_username=current_user.lichess_username,
-        subscription_tier=current_user.subscription_tier,
-        created_at=current_user.created_at.isoformat()
+        id=current_user["user_id"],
+        email=current_user["email"],
+        lichess_username=current_user["lichess_username"],
+        subscription_tier=current_user["subscription_tier"],
+        created_at=current_user["created_at"]
     )
 
 
 @router.post("/refresh-games")
-async def refresh_games(current_user: User = Depends(get_current_user)):
+async def refresh_games(
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_user)
+):
     """Trigger refresh of user's games from Lichess"""
     try:
         if not current_user.lichess_username:
@@ -194,17 +310,17 @@ async def refresh_games(current_user: User = Depends(get_current_user)):
                 detail="No Lichess username associated with account"
             )
         
-        # Start background game fetching
-        fetch_user_games_task.delay(current_user.id, current_user.lichess_username)
+        # Start background game fetching once the response has been sent
+        background_tasks.add_task(fetch_user_games_task.delay, current_user.id, current_user.lichess_username)
         
-        logger.info("Game refresh triggered", user_id=current_user.id)
+        logger.info("Game refresh triggered", extra={"user_id": current_user.id})
         
         return {"message": "Game refresh started successfully"}
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error("Game refresh failed", error=str(e), user_id=current_user.id)
+        logger.error("Game refresh failed", extra={"error": str(e), "user_id": current_user.id})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to start game refresh. Please try again."
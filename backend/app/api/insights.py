@@ -1,25 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional, Dict, Any
-import structlog
+import logging
 
 from app.database.database import get_db
-from app.database.models import User
-from app.api.auth import get_current_user
+from app.api.auth import get_current_user_claims
 
-logger = structlog.get_logger()
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
 class UserInsights(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     insights_available: bool
     data: Optional[Dict[str, Any]] = None
     generated_at: Optional[str] = None
 
 
 @router.get("/", response_model=UserInsights)
-async def get_user_insights(current_user: User = Depends(get_current_user)):
+async def get_user_insights(current_user: Dict[str, Any] = Depends(get_current_user_claims)):
     """Get comprehensive user insights and analysis"""
     try:
         # For now, return a placeholder response
@@ -31,7 +32,7 @@ async def get_user_insights(current_user: User = Depends(get_current_user)):
         )
         
     except Exception as e:
-        logger.error(f"Failed to get insights for user {current_user.id}", error=str(e))
+        logger.error("Failed to get insights", extra={"user_id": current_user['user_id'], "error": str(e)})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to get user insights"
@@ -1,18 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import List, Optional
-import structlog
+from pydantic import BaseModel, ConfigDict
+from typing import List, Optional, Dict, Any
+import logging
 
 from app.database.database import get_db
-from app.database.models import User
-from app.api.auth import get_current_user
+from app.api.auth import get_current_user_claims
 
-logger = structlog.get_logger()
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
 class TrainingRecommendation(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     type: str
     priority: str
     title: str
@@ -20,13 +21,15 @@ class TrainingRecommendation(BaseModel):
 
 
 class TrainingRecommendations(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     recommendations: List[TrainingRecommendation]
     total_count: int
     generated_at: Optional[str] = None
 
 
 @router.get("/", response_model=TrainingRecommendations)
-async def get_training_recommendations(current_user: User = Depends(get_current_user)):
+async def get_training_recommendations(current_user: Dict[str, Any] = Depends(get_current_user_claims)):
     """Get personalized training recommendations"""
     try:
         # For now, return placeholder recommendations
@@ -53,7 +56,7 @@ async def get_training_recommendations(current_user: User = Depends(get_current_
         )
         
     except Exception as e:
-        logger.error(f"Failed to get recommendations for user {current_user.id}", error=str(e))
+        logger.error("Failed to get recommendations", extra={"user_id": current_user['user_id'], "error": str(e)})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to get training recommendations"
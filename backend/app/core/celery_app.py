@@ -1,9 +1,16 @@
 from celery import Celery
+from celery.signals import worker_process_shutdown
 from app.config import settings
+from app.core.logging_config import configure_structlog
+import asyncio
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Services log through structlog; Celery manages stdlib logging itself
+configure_structlog(logging.DEBUG if settings.debug else logging.INFO)
+
 # Create Celery app
 celery_app = Celery(
     "chessforge",
@@ -43,4 +50,31 @@ if settings.celery_result_backend:
     celery_app.conf.result_backend = settings.celery_result_backend
     celery_app.conf.result_expires = 3600  # 1 hour
 
+# Each worker thread keeps one event loop for the life of the process so
+# async resources bound to it (such as the Stockfish engine pool) survive
+# from one task to the next
+_worker_loops = threading.local()
+
+
+def run_async(coro):
+    """Run a coroutine to completion on this worker's persistent event loop"""
+    loop = getattr(_worker_loops, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = _worker_loops.loop = asyncio.new_event_loop()
+    return loop.run_until_complete(coro)
+
+
+@worker_process_shutdown.connect
+def _close_worker_resources(**kwargs):
+    """Stop pooled Stockfish engines and HTTP clients when a worker process exits"""
+    loop = getattr(_worker_loops, "loop", None)
+    if loop is None or loop.is_closed():
+        return
+    from app.core.engine_pool import close_engine_pools
+    from app.services.lichess_service import close_lichess_client
+    loop.run_until_complete(close_engine_pools())
+    loop.run_until_complete(close_lichess_client())
+    loop.close()
+
+
 logger.info("Celery app configured successfully")
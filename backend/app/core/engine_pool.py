@@ -0,0 +1,94 @@
+import asyncio
+import chess.engine
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EnginePool:
+    """Long-lived Stockfish processes checked out per analysis"""
+    
+    def __init__(self, path: str, threads: int, hash_size: int, size: int):
+        self.path = path
+        self.threads = threads
+        self.hash_size = hash_size
+        self.size = size
+        self._engines: List[chess.engine.UciProtocol] = []
+        self._idle: asyncio.Queue = asyncio.Queue()
+    
+    async def _spawn(self) -> chess.engine.UciProtocol:
+        """Start and configure one engine process"""
+        _, engine = await chess.engine.popen_uci(self.path)
+        await engine.configure({
+            "Threads": self.threads,
+            "Hash": self.hash_size
+        })
+        self._engines.append(engine)
+        return engine
+    
+    async def start(self) -> None:
+        """Start every engine in the pool"""
+        for _ in range(self.size):
+            self._idle.put_nowait(await self._spawn())
+        logger.info(f"Started {self.size} Stockfish engines ({self.threads} threads, {self.hash_size} MB hash)")
+    
+    async def acquire(self) -> chess.engine.UciProtocol:
+        """Check out an idle engine, replacing it if the process has died"""
+        engine = await self._idle.get()
+        if engine.returncode.done():
+            logger.warning("Replacing terminated Stockfish engine")
+            self._engines.remove(engine)
+            engine = await self._spawn()
+        return engine
+    
+    def release(self, engine: chess.engine.UciProtocol) -> None:
+        """Return an engine to the pool"""
+        self._idle.put_nowait(engine)
+    
+    async def close(self) -> None:
+        """Shut down every engine process"""
+        for engine in self._engines:
+            try:
+                await engine.quit()
+            except chess.engine.EngineError:
+                pass
+        self._engines.clear()
+
+
+# Pools are keyed by engine configuration and created on first use
+# inside the event loop that will drive them
+_pools: Dict[Tuple[str, int, int], EnginePool] = {}
+
+
+async def get_engine_pool(
+    path: Optional[str] = None,
+    threads: Optional[int] = None,
+    hash_size: Optional[int] = None
+) -> EnginePool:
+    """Get the engine pool for a Stockfish configuration"""
+    key = (
+        path or settings.stockfish_path,
+        threads or settings.stockfish_threads,
+        hash_size or settings.stockfish_hash_size,
+    )
+    pool = _pools.get(key)
+    if pool is None:
+        # Registered before starting so concurrent callers wait on its queue
+        pool = _pools[key] = EnginePool(*key, size=settings.stockfish_workers)
+        try:
+            await pool.start()
+        except Exception:
+            del _pools[key]
+            await pool.close()
+            raise
+    return pool
+
+
+async def close_engine_pools() -> None:
+    """Shut down all engine pools"""
+    while _pools:
+        _, pool = _pools.popitem()
+        await pool.close()
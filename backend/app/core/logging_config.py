@@ -0,0 +1,59 @@
+import logging
+import sys
+import orjson
+import structlog
+
+# Attributes every LogRecord carries; anything else was passed via extra=
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Render log records as single-line JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+def _orjson_dumps(obj, **kwargs) -> str:
+    """Encode with orjson, returning text for loggers that write str"""
+    return orjson.dumps(obj, **kwargs).decode()
+
+
+def configure_structlog(level: int = logging.INFO) -> None:
+    """Configure structlog with a minimal processor chain"""
+    # Records below the level are dropped by the bound logger itself, before
+    # any processor runs. Output goes through sys.stdout's text interface:
+    # Celery workers replace stdout with a LoggingProxy that has no .buffer
+    structlog.configure(
+        processors=[
+            structlog.processors.add_log_level,
+            structlog.processors.TimeStamper(fmt="iso", utc=True),
+            structlog.processors.JSONRenderer(serializer=_orjson_dumps),
+        ],
+        wrapper_class=structlog.make_filtering_bound_logger(level),
+        logger_factory=structlog.WriteLoggerFactory(),
+        cache_logger_on_first_use=True,
+    )
+
+
+def configure_logging(level: int = logging.INFO) -> None:
+    """Install the JSON formatter on the root logger and configure structlog"""
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+
+    configure_structlog(level)
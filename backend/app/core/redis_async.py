@@ -0,0 +1,72 @@
+import redis.asyncio as aioredis
+from app.config import settings
+import msgpack
+import orjson
+import logging
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# Create async Redis client for FastAPI handlers; Celery workers keep
+# using the sync client in app.core.redis_client
+aioredis_client = aioredis.Redis.from_url(
+    settings.redis_url,
+    decode_responses=False,
+    socket_connect_timeout=5,
+    socket_timeout=5,
+    retry_on_timeout=True,
+    max_connections=50,
+)
+
+
+async def aset_cache(key: str, value: Any, expire: int = 3600) -> bool:
+    """Set a value in cache with expiration"""
+    try:
+        if isinstance(value, (dict, list)):
+            value = orjson.dumps(value)
+        await aioredis_client.setex(key, expire, value)
+        return True
+    except Exception as e:
+        logger.error(f"Failed to set cache key {key}: {e}")
+        return False
+
+
+async def aget_cache(key: str) -> Optional[Any]:
+    """Get a value from cache"""
+    try:
+        value = await aioredis_client.get(key)
+        if value is None:
+            return None
+
+        # Try to parse as JSON
+        try:
+            return orjson.loads(value)
+        except orjson.JSONDecodeError:
+            return value.decode()
+    except Exception as e:
+        logger.error(f"Failed to get cache key {key}: {e}")
+        return None
+
+
+async def adelete_cache(key: str) -> bool:
+    """Delete a key from cache"""
+    try:
+        await aioredis_client.delete(key)
+        return True
+    except Exception as e:
+        logger.error(f"Failed to delete cache key {key}: {e}")
+        return False
+
+
+async def aget_analysis_progress(user_id: int) -> Optional[Dict[str, Any]]:
+    """Get analysis progress for a user"""
+    try:
+        key = f"analysis_progress:{user_id}"
+        progress = await aioredis_client.get(key)
+        if not progress:
+            return None
+
+        return msgpack.unpackb(progress)
+    except Exception as e:
+        logger.error(f"Failed to get analysis progress for user {user_id}: {e}")
+        return None
@@ -1,6 +1,7 @@
 import redis
 from app.config import settings
-import json
+import msgpack
+import orjson
 import logging
 from typing import Optional, Dict, Any
 
@@ -9,7 +10,7 @@ logger = logging.getLogger(__name__)
 # Create Redis client
 redis_client = redis.Redis.from_url(
     settings.redis_url,
-    decode_responses=True,
+    decode_responses=False,
     socket_connect_timeout=5,
     socket_timeout=5,
     retry_on_timeout=True,
@@ -20,7 +21,7 @@ def set_cache(key: str, value: Any, expire: int = 3600) -> bool:
     """Set a value in cache with expiration"""
     try:
         if isinstance(value, (dict, list)):
-            value = json.dumps(value)
+            value = orjson.dumps(value)
         redis_client.setex(key, expire, value)
         return True
     except Exception as e:
@@ -37,9 +38,9 @@ def get_cache(key: str) -> Optional[Any]:
         
         # Try to parse as JSON
         try:
-            return json.loads(value)
-        except json.JSONDecodeError:
-            return value
+            return orjson.loads(value)
+        except orjson.JSONDecodeError:
+            return value.decode()
     except Exception as e:
         logger.error(f"Failed to get cache key {key}: {e}")
         return None
@@ -55,12 +56,62 @@ def delete_cache(key: str) -> bool:
         return False
 
 
-def update_analysis_progress(user_id: int, progress_data: Dict[str, Any]) -> bool:
-    """Update analysis progress for a user"""
+# Analysis progress lives in a single msgpack blob per user. Partial
+# updates are merged server-side so concurrent workers don't clobber
+# each other's fields, and the TTL is refreshed in the same round-trip.
+# Counters are incremented in the same script, which then recomputes
+# the percentage and marks the run completed once every game is done.
+# msgpack has no place for nil inside a Lua table, so fields set to
+# None are passed separately and removed from the stored map.
+ANALYSIS_PROGRESS_TTL = 86400  # 24 hours
+
+_merge_progress_script = redis_client.register_script("""
+local current = redis.call('GET', KEYS[1])
+local progress = current and cmsgpack.unpack(current) or {}
+for k, v in pairs(cmsgpack.unpack(ARGV[1])) do
+    progress[k] = v
+end
+local incremented = false
+for k, v in pairs(cmsgpack.unpack(ARGV[3])) do
+    progress[k] = (tonumber(progress[k]) or 0) + v
+    incremented = true
+end
+for i = 4, #ARGV do
+    progress[ARGV[i]] = nil
+end
+local total = tonumber(progress['games_total']) or 0
+if incremented and total > 0 then
+    local done = (tonumber(progress['games_completed']) or 0) + (tonumber(progress['games_failed']) or 0)
+    progress['percentage'] = math.floor(1000 * done / total) / 10
+    if done >= total then
+        progress['status'] = 'completed'
+    end
+end
+redis.call('SET', KEYS[1], cmsgpack.pack(progress), 'EX', ARGV[2])
+return 1
+""")
+
+
+def update_analysis_progress(
+    user_id: int,
+    progress_data: Dict[str, Any],
+    increments: Optional[Dict[str, int]] = None,
+    pipe: Optional[redis.client.Pipeline] = None
+) -> bool:
+    """Update analysis progress for a user, optionally incrementing counters
+
+    When a pipeline is given the update is only queued on it, and is sent
+    when the caller executes the pipeline.
+    """
     try:
         key = f"analysis_progress:{user_id}"
-        redis_client.hset(key, mapping=progress_data)
-        redis_client.expire(key, 86400)  # 24 hours
+        updates = {k: v for k, v in progress_data.items() if v is not None}
+        cleared = [k for k, v in progress_data.items() if v is None]
+        _merge_progress_script(
+            keys=[key],
+            args=[msgpack.packb(updates), ANALYSIS_PROGRESS_TTL, msgpack.packb(increments or {}), *cleared],
+            client=pipe
+        )
         return True
     except Exception as e:
         logger.error(f"Failed to update analysis progress for user {user_id}: {e}")
@@ -71,21 +122,11 @@ def get_analysis_progress(user_id: int) -> Optional[Dict[str, Any]]:
     """Get analysis progress for a user"""
     try:
         key = f"analysis_progress:{user_id}"
-        progress = redis_client.hgetall(key)
+        progress = redis_client.get(key)
         if not progress:
             return None
         
-        # Convert string values to appropriate types
-        result = {}
-        for k, v in progress.items():
-            if k in ['games_total', 'games_completed', 'games_failed']:
-                result[k] = int(v)
-            elif k in ['percentage']:
-                result[k] = float(v)
-            else:
-                result[k] = v
-        
-        return result
+        return msgpack.unpackb(progress)
     except Exception as e:
         logger.error(f"Failed to get analysis progress for user {user_id}: {e}")
         return None
@@ -0,0 +1,14 @@
+import msgspec
+from fastapi.responses import Response
+from typing import Any
+
+# Shared encoder; msgspec encoders are reusable and thread-safe
+_encoder = msgspec.json.Encoder()
+
+
+class MsgspecJSONResponse(Response):
+    """JSON response encoded with msgspec, for msgspec.Struct payloads"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return _encoder.encode(content)
@@ -1,14 +1,39 @@
-from datetime import datetime, timedelta
-from typing import Optional, Union
-from jose import JWTError, jwt
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Union, Tuple
+import base64
+import hashlib
+import hmac
+import jwt
+import orjson
 from passlib.context import CryptContext
 from app.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# JWT signing key and accepted algorithms, derived once at import
+_SECRET = settings.secret_key.encode()
+_ALGORITHMS = [settings.algorithm]
+
+
+def _b64url(data: bytes) -> bytes:
+    """Unpadded base64url encoding used by JWS"""
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+# Encoded header shared by every HS256 token we issue
+_HS256_HEADER = _b64url(orjson.dumps({"alg": "HS256", "typ": "JWT"}))
+
+# Password hashing: argon2id for new hashes, existing bcrypt hashes are
+# still accepted and flagged for upgrade on the next successful login.
+# Costs follow the OWASP argon2id baseline (19 MiB, 2 iterations, 1 lane).
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated="auto",
+    argon2__memory_cost=19456,
+    argon2__time_cost=2,
+    argon2__parallelism=1,
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -16,6 +41,11 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password and return a replacement hash if the stored one is deprecated"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
@@ -26,15 +56,20 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode = data.copy()
     
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = datetime.now(timezone.utc) + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
+        expire = datetime.now(timezone.utc) + timedelta(minutes=settings.access_token_expire_minutes)
     
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": int(expire.timestamp())})
     
     try:
-        encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
-        return encoded_jwt
+        if settings.algorithm != "HS256":
+            return jwt.encode(to_encode, _SECRET, algorithm=settings.algorithm)
+        
+        # Sign directly: only the payload needs encoding per token
+        signing_input = _HS256_HEADER + b"." + _b64url(orjson.dumps(to_encode))
+        signature = hmac.new(_SECRET, signing_input, hashlib.sha256).digest()
+        return (signing_input + b"." + _b64url(signature)).decode()
     except Exception as e:
         logger.error(f"Failed to create access token: {e}")
         raise
@@ -43,9 +78,9 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 def verify_token(token: str) -> Optional[dict]:
     """Verify and decode a JWT token"""
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        payload = jwt.decode(token, _SECRET, algorithms=_ALGORITHMS)
         return payload
-    except JWTError as e:
+    except jwt.PyJWTError as e:
         logger.error(f"JWT verification failed: {e}")
         return None
     except Exception as e:
@@ -68,5 +103,7 @@ def get_current_user_from_token(token: str) -> Optional[dict]:
     return {
         "user_id": user_id,
         "email": email,
-        "lichess_username": payload.get("lichess_username")
+        "lichess_username": payload.get("lichess_username"),
+        "subscription_tier": payload.get("subscription_tier"),
+        "created_at": payload.get("created_at")
     }
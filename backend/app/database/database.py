@@ -1,16 +1,30 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 from app.config import settings
+from uuid import uuid4
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Create database engine
+if settings.db_use_pgbouncer:
+    # PgBouncer does the pooling; hold no idle connections client-side
+    pool_options = {"poolclass": NullPool}
+else:
+    pool_options = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+    }
+
+# Create database engine (used by Celery workers and table creation)
 engine = create_engine(
     settings.database_url,
-    poolclass=StaticPool,
+    **pool_options,
+    executemany_mode="values_plus_batch",
     pool_pre_ping=True,
     echo=settings.debug,
 )
@@ -18,21 +32,40 @@ engine = create_engine(
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Create async database engine (used by API request handlers)
+# PgBouncer transaction pooling can't keep server-side prepared statements
+# across transactions, so disable asyncpg's statement caches and give each
+# prepared statement a unique name.
+async_connect_args = {
+    "statement_cache_size": 0,
+    "prepared_statement_cache_size": 0,
+    "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+} if settings.db_use_pgbouncer else {}
+
+async_engine = create_async_engine(
+    settings.database_url.replace("postgresql://", "postgresql+asyncpg://"),
+    **pool_options,
+    connect_args=async_connect_args,
+    pool_pre_ping=True,
+    echo=settings.debug,
+)
+
+# Create async session factory
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Create base class for models
 Base = declarative_base()
 
 
-def get_db():
-    """Dependency to get database session"""
-    db = SessionLocal()
-    try:
-        yield db
-    except Exception as e:
-        logger.error(f"Database session error: {e}")
-        db.rollback()
-        raise
-    finally:
-        db.close()
+async def get_db():
+    """Dependency to get async database session"""
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception as e:
+            logger.error(f"Database session error: {e}")
+            await db.rollback()
+            raise
 
 
 def init_db():
@@ -1,18 +1,37 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
+import asyncio
+import logging
+import time
+
+from app.config import settings
+from app.core.logging_config import configure_logging
+from app.core.redis_async import aioredis_client
+
+configure_logging(logging.DEBUG if settings.debug else logging.INFO)
+logger = logging.getLogger(__name__)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events"""
     # Startup
     print("Starting ChessForgeAI Backend")
+    logger.info("Event loop: %s", type(asyncio.get_running_loop()).__name__)
+    
+    # Shared async Redis client, closed on shutdown
+    app.state.redis = aioredis_client
+    
     print("Backend started successfully")
     
     yield
     
     # Shutdown
     print("Shutting down ChessForgeAI Backend")
+    await app.state.redis.close()
 
 
 # Create FastAPI app
@@ -23,6 +42,7 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Add middleware
@@ -34,6 +54,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large responses such as per-move game analysis; small ones
+# like /health stay below the threshold
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 
 @app.get("/")
 async def root():
@@ -45,20 +69,35 @@ async def root():
     }
 
 
+# Probes can hit /health several times a second; reuse the last Redis
+# ping for a few seconds instead of pinging on every request
+REDIS_HEALTH_TTL = 5.0
+_redis_health = {"checked_at": float("-inf"), "connected": False}
+
+
 @app.get("/health")
-async def health_check():
+async def health_check(request: Request):
     """Health check endpoint"""
+    now = time.monotonic()
+    if now - _redis_health["checked_at"] > REDIS_HEALTH_TTL:
+        try:
+            _redis_health["connected"] = bool(await request.app.state.redis.ping())
+        except Exception:
+            _redis_health["connected"] = False
+        _redis_health["checked_at"] = now
+    
     return {
         "status": "healthy",
-        "message": "Backend is running"
+        "message": "Backend is running",
+        "redis": "connected" if _redis_health["connected"] else "disconnected"
     }
 
 
-@app.exception_handler(HTTPException)
-async def http_exception_handler(request, exc):
-    """Global HTTP exception handler"""
-    print(f"HTTP exception occurred: {exc.status_code} - {exc.detail}")
-    return {"error": exc.detail, "status_code": exc.status_code}
+@app.exception_handler(Exception)
+async def unhandled_exception_handler(request: Request, exc: Exception):
+    """Global handler for unhandled exceptions"""
+    logger.error("Unhandled exception on %s %s", request.method, request.url.path, exc_info=exc)
+    return ORJSONResponse(status_code=500, content={"error": "Internal server error"})
 
 
 if __name__ == "__main__":
@@ -67,6 +106,10 @@ if __name__ == "__main__":
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        loop="uvloop",
+        http="httptools",
+        # The reloader runs a single process, so workers only apply outside debug
+        workers=None if settings.debug else settings.workers,
+        reload=settings.debug,
         log_level="info"
     )
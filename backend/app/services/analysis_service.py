@@ -1,18 +1,64 @@
+import asyncio
+import io
 import chess
 import chess.pgn
 import chess.engine
+import chess.polyglot
 import structlog
-from datetime import datetime
-from typing import List, Dict, Optional
-from sqlalchemy.orm import Session
+from bisect import bisect_left
+from typing import List, Dict, Optional, Tuple
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
 from app.database.models import Game, GameAnalysis
-from app.core.celery_app import celery_app
-from app.core.redis_client import update_analysis_progress
+from app.core.celery_app import celery_app, run_async
+from app.core.redis_client import redis_client, update_analysis_progress
+from app.core.redis_async import aget_cache, aset_cache
+from app.core.engine_pool import EnginePool, get_engine_pool
 
 logger = structlog.get_logger()
 
+# Finished analyses don't change until a game is re-analyzed, which
+# invalidates the cached copy; bump the version when the shape changes
+GAME_ANALYSIS_CACHE_VERSION = 1
+GAME_ANALYSIS_CACHE_TTL = 7 * 86400  # 7 days
+
+
+# Upper bounds (inclusive) of eval loss for each move quality label
+_QUALITY_THRESHOLDS = (10, 25, 50, 100)
+_QUALITY_LABELS = ('excellent', 'good', 'inaccuracy', 'mistake', 'blunder')
+
+
+def _game_analysis_cache_key(game_id: int, user_id: int) -> str:
+    """Build the Redis key caching a game's analysis response"""
+    return f"game_analysis:v{GAME_ANALYSIS_CACHE_VERSION}:{game_id}:{user_id}"
+
+
+# Engine evaluations are shared across games and users; the Zobrist hash
+# covers pieces, side to move, castling and en passant rights
+EVAL_CACHE_TTL = 30 * 86400  # 30 days
+
+
+def _eval_cache_key(board: chess.Board) -> str:
+    """Build the Redis key caching a position's engine evaluation"""
+    return f"sf:d15:mpv3:{chess.polyglot.zobrist_hash(board):016x}"
+
+
+class MainlineGameBuilder(chess.pgn.GameBuilder):
+    """Game builder that keeps only the mainline moves and headers"""
+    
+    def begin_variation(self):
+        return chess.pgn.SKIP
+    
+    def end_variation(self) -> None:
+        # read_game still reports the end of a skipped variation; nothing
+        # was pushed for it, so there is nothing to pop
+        pass
+    
+    def visit_comment(self, comment: str) -> None:
+        pass
+
 
 class ChessAnalysisEngine:
     def __init__(self):
@@ -23,69 +69,144 @@ class ChessAnalysisEngine:
     async def analyze_game(self, game: Game) -> List[Dict]:
         """Comprehensive game analysis using Stockfish"""
         try:
-            pgn_io = chess.pgn.StringIO(game.pgn)
-            chess_game = chess.pgn.read_game(pgn_io)
+            chess_game = chess.pgn.read_game(io.StringIO(game.pgn), Visitor=MainlineGameBuilder)
             board = chess_game.board()
             
-            analysis_results = []
             move_times = self._extract_move_times(chess_game)
             
-            async with chess.engine.SimpleEngine.popen_uci(self.stockfish_path) as engine:
-                # Configure engine
-                engine.configure({
-                    "Threads": self.threads,
-                    "Hash": self.hash_size
-                })
+            # Walk the game once to collect each position before its move
+            plies = []
+            for move in chess_game.mainline_moves():
+                plies.append((board.copy(stack=False), move))
+                board.push(move)
+            
+            # Book plies at the start of the game aren't worth engine time
+            skip_plies = settings.opening_skip_plies
+            
+            # Positions are independent, so spread them across the engine pool.
+            # Only as many plies run at once as there are engines; the rest
+            # would just queue for one while holding Redis connections.
+            pool = await get_engine_pool(self.stockfish_path, self.threads, self.hash_size)
+            limiter = asyncio.Semaphore(pool.size)
+            
+            async def analyze_ply(pre_board: chess.Board, move: chess.Move):
+                async with limiter:
+                    return await self._analyze_ply(pool, game.id, pre_board, move)
+            
+            evaluations = await asyncio.gather(*[
+                analyze_ply(pre_board, move) for pre_board, move in plies[skip_plies:]
+            ])
+            evaluations = [None] * min(skip_plies, len(plies)) + evaluations
+            
+            analysis_results = []
+            for i, ((pre_board, move), evaluation) in enumerate(zip(plies, evaluations)):
+                post_board = pre_board.copy(stack=False)
+                post_board.push(move)
                 
-                for i, move in enumerate(chess_game.mainline_moves()):
-                    # Analyze position before move
-                    pre_analysis = await engine.analyse(
-                        board, 
-                        chess.engine.Limit(time=0.1, depth=15),
-                        multipv=3
-                    )
-                    
-                    # Get best move and evaluation
-                    best_move = pre_analysis['pv'][0][0] if pre_analysis['pv'] else None
-                    pre_eval = self._score_to_centipawns(pre_analysis['score'].white())
-                    
-                    # Make the actual move
-                    board.push(move)
-                    
-                    # Analyze position after move
-                    post_analysis = await engine.analyse(
-                        board, 
-                        chess.engine.Limit(time=0.1, depth=15)
-                    )
-                    post_eval = self._score_to_centipawns(post_analysis['score'].white())
-                    
-                    # Calculate move quality
-                    eval_loss = self._calculate_eval_loss(pre_eval, post_eval, board.turn)
-                    move_quality = self._categorize_move_quality(eval_loss)
-                    game_phase = self._determine_game_phase(board)
-                    
+                if evaluation is None:
                     analysis_results.append({
                         'move_number': i + 1,
-                        'position_fen': board.fen(),
+                        'position_fen': post_board.fen(),
                         'move_played': str(move),
-                        'best_move': str(best_move) if best_move else None,
-                        'stockfish_eval': post_eval,
-                        'eval_loss': eval_loss,
-                        'move_quality': move_quality,
+                        'best_move': None,
+                        'stockfish_eval': None,
+                        'eval_loss': 0.0,
+                        'move_quality': 'excellent',
                         'time_spent': move_times.get(i, 0),
-                        'game_phase': game_phase,
-                        'analysis_depth': 15,
-                        'analysis_time': 0.1
+                        'game_phase': 'opening',
+                        'analysis_depth': 0,
+                        'analysis_time': 0.0
                     })
+                    continue
+                
+                best_move, pre_eval, post_eval = evaluation
+                
+                # Calculate move quality
+                eval_loss = self._calculate_eval_loss(pre_eval, post_eval, post_board.turn)
+                move_quality = self._categorize_move_quality(eval_loss)
+                game_phase = self._determine_game_phase(post_board)
+                
+                analysis_results.append({
+                    'move_number': i + 1,
+                    'position_fen': post_board.fen(),
+                    'move_played': str(move),
+                    'best_move': str(best_move) if best_move else None,
+                    'stockfish_eval': post_eval,
+                    'eval_loss': eval_loss,
+                    'move_quality': move_quality,
+                    'time_spent': move_times.get(i, 0),
+                    'game_phase': game_phase,
+                    'analysis_depth': 15,
+                    'analysis_time': 0.1
+                })
             
-            logger.info(f"Completed analysis for game {game.id}", 
-                       game_id=game.id, moves_analyzed=len(analysis_results))
+            logger.debug("Completed engine analysis", game_id=game.id, moves_analyzed=len(analysis_results))
             return analysis_results
             
         except Exception as e:
             logger.error(f"Failed to analyze game {game.id}", error=str(e))
             raise
     
+    async def _analyze_ply(
+        self, pool: EnginePool, game_id: int, board: chess.Board, move: chess.Move
+    ) -> Tuple[Optional[chess.Move], float, float]:
+        """Evaluate a position and the move played from it, using cached evaluations when possible"""
+        position = await self._evaluate_position(pool, game_id, board)
+        best_move = chess.Move.from_uci(position['best_move']) if position['best_move'] else None
+        
+        # Reuse the played move's line when the engine considered it,
+        # otherwise evaluate the position after the move
+        post_eval = position['lines'].get(move.uci())
+        if post_eval is None:
+            post_board = board.copy(stack=False)
+            post_board.push(move)
+            cached = await aget_cache(_eval_cache_key(post_board))
+            if cached:
+                post_eval = cached['eval']
+            else:
+                post_analysis = await self._engine_analyse(pool, game_id, post_board)
+                post_eval = self._score_to_centipawns(post_analysis['score'].white())
+        
+        return best_move, position['eval'], post_eval
+    
+    async def _evaluate_position(self, pool: EnginePool, game_id: int, board: chess.Board) -> Dict:
+        """Get the best move, evaluation and candidate line evaluations for a position"""
+        cache_key = _eval_cache_key(board)
+        cached = await aget_cache(cache_key)
+        if cached:
+            return cached
+        
+        analysis = await self._engine_analyse(
+            pool, game_id, board, multipv=min(3, board.legal_moves.count())
+        )
+        position = {
+            'best_move': analysis[0]['pv'][0].uci() if analysis[0].get('pv') else None,
+            'eval': self._score_to_centipawns(analysis[0]['score'].white()),
+            # Evaluation of each candidate line, keyed by its first move
+            'lines': {
+                info['pv'][0].uci(): self._score_to_centipawns(info['score'].white())
+                for info in analysis if info.get('pv')
+            }
+        }
+        
+        await aset_cache(cache_key, position, expire=EVAL_CACHE_TTL)
+        return position
+    
+    async def _engine_analyse(self, pool: EnginePool, game_id: int, board: chess.Board, **kwargs):
+        """Run one analysis on a pooled engine"""
+        # Passing game=game_id makes the engine send ucinewgame when it
+        # switches games instead of restarting the process
+        engine = await pool.acquire()
+        try:
+            return await engine.analyse(
+                board, 
+                chess.engine.Limit(time=0.1, depth=15),
+                game=game_id,
+                **kwargs
+            )
+        finally:
+            pool.release(engine)
+    
     def _score_to_centipawns(self, score) -> float:
         """Convert Stockfish score to centipawns"""
         if score.is_mate():
@@ -105,20 +226,12 @@ class ChessAnalysisEngine:
     
     def _categorize_move_quality(self, eval_loss: float) -> str:
         """Categorize move quality based on evaluation loss"""
-        if eval_loss <= 10:
-            return 'excellent'
-        elif eval_loss <= 25:
-            return 'good'
-        elif eval_loss <= 50:
-            return 'inaccuracy'
-        elif eval_loss <= 100:
-            return 'mistake'
-        else:
-            return 'blunder'
+        # bisect_left keeps losses equal to a threshold in the lower band
+        return _QUALITY_LABELS[bisect_left(_QUALITY_THRESHOLDS, eval_loss)]
     
     def _determine_game_phase(self, board: chess.Board) -> str:
         """Determine current game phase"""
-        piece_count = len(board.piece_map())
+        piece_count = board.occupied.bit_count()
         
         if piece_count > 28:
             return 'opening'
@@ -136,147 +249,242 @@ class ChessAnalysisEngine:
 
 
 # Celery task for background game analysis
-@celery_app.task(bind=True)
-def analyze_game_task(self, game_id: int):
-    """Background task to analyze a single game"""
+@celery_app.task(bind=True, acks_late=True)
+def analyze_games_task(self, game_ids: List[int]):
+    """Background task to analyze a batch of games"""
+    from app.database.database import SessionLocal
+    
+    db = SessionLocal()
+    user_id = None
     try:
-        from app.database.database import SessionLocal
-        
-        db = SessionLocal()
-        
-        # Get game from database
-        game = db.query(Game).filter(Game.id == game_id).first()
-        if not game:
-            logger.error(f"Game {game_id} not found")
+        # Get the games still awaiting analysis
+        games = db.scalars(select(Game).where(
+            Game.id.in_(game_ids),
+            Game.analyzed.is_not(True)
+        )).all()
+        if not games:
+            logger.info("No games left to analyze in batch", game_ids=game_ids)
             return
         
-        # Update game status
-        game.analysis_started_at = datetime.utcnow()
+        user_id = games[0].user_id
+        
+        # Update game status, timestamped by the database
+        db.execute(update(Game).where(
+            Game.id.in_([game.id for game in games])
+        ).values(analysis_started_at=func.now()))
         db.commit()
         
         # Update progress
-        update_analysis_progress(game.user_id, {
+        update_analysis_progress(user_id, {
             'status': 'analyzing',
-            'current_game_id': game_id
+            'current_game_id': games[0].id
         })
         
         # Perform analysis
         analysis_engine = ChessAnalysisEngine()
-        analysis_results = analysis_engine.analyze_game(game)
+        analysis_rows = []
+        analyzed_ids = []
+        failed_ids = []
+        for game in games:
+            try:
+                analysis_results = run_async(analysis_engine.analyze_game(game))
+            except Exception as e:
+                logger.error(f"Failed to analyze game {game.id}", error=str(e))
+                failed_ids.append(game.id)
+                continue
+            
+            analysis_rows.extend({**result, 'game_id': game.id} for result in analysis_results)
+            analyzed_ids.append(game.id)
         
-        # Store analysis results
-        for result in analysis_results:
-            analysis = GameAnalysis(
-                game_id=game_id,
-                move_number=result['move_number'],
-                position_fen=result['position_fen'],
-                stockfish_eval=result['stockfish_eval'],
-                move_played=result['move_played'],
-                best_move=result['best_move'],
-                eval_loss=result['eval_loss'],
-                move_quality=result['move_quality'],
-                time_spent=result['time_spent'],
-                game_phase=result['game_phase'],
-                analysis_depth=result['analysis_depth'],
-                analysis_time=result['analysis_time']
-            )
-            db.add(analysis)
+        # Store the whole batch's analysis in a single executemany INSERT
+        if analysis_rows:
+            db.execute(insert(GameAnalysis), analysis_rows)
         
-        # Mark game as analyzed
-        game.analyzed = True
-        game.analysis_completed_at = datetime.utcnow()
+        # Mark games as analyzed, or ready to retry if they failed
+        if analyzed_ids:
+            db.execute(update(Game).where(Game.id.in_(analyzed_ids)).values(
+                analyzed=True,
+                analysis_completed_at=func.now()
+            ))
+        if failed_ids:
+            db.execute(update(Game).where(Game.id.in_(failed_ids)).values(
+                analysis_started_at=None
+            ))
         db.commit()
         
-        # Update progress
-        progress = update_analysis_progress(game.user_id, {
-            'games_completed': 1,  # Increment completed count
-            'current_game_id': None
-        })
+        # Drop any cached responses built before this analysis and update
+        # progress, all in one Redis round-trip
+        with redis_client.pipeline(transaction=False) as pipe:
+            for game_id in analyzed_ids:
+                pipe.delete(_game_analysis_cache_key(game_id, user_id))
+            update_analysis_progress(user_id, {
+                'current_game_id': None
+            }, increments={
+                'games_completed': len(analyzed_ids),
+                'games_failed': len(failed_ids)
+            }, pipe=pipe)
+            pipe.execute()
         
-        logger.info(f"Completed analysis for game {game_id}", 
-                   game_id=game_id, moves_analyzed=len(analysis_results))
+        logger.info(f"Completed analysis for {len(analyzed_ids)} games", 
+                   game_ids=analyzed_ids, games_failed=len(failed_ids),
+                   moves_analyzed=len(analysis_rows))
         
     except Exception as e:
-        logger.error(f"Failed to analyze game {game_id}", error=str(e))
-        
-        # Update game status on failure
-        try:
-            game.analysis_started_at = None
-            db.commit()
-        except:
-            pass
+        logger.error(f"Failed to analyze games {game_ids}", error=str(e))
+        db.rollback()
         
         # Update progress
-        update_analysis_progress(game.user_id, {
-            'games_failed': 1,  # Increment failed count
-            'status': 'failed',
-            'error_message': str(e)
-        })
+        if user_id is not None:
+            update_analysis_progress(user_id, {
+                'status': 'failed',
+                'error_message': str(e)
+            })
         raise
     finally:
         db.close()
 
 
 # Service functions for API endpoints
-async def get_game_analysis(game_id: int, user_id: int, db: Session) -> Optional[Dict]:
+async def _get_user_game(game_id: int, user_id: int, db: AsyncSession) -> Optional[Game]:
+    """Get a game owned by the user"""
+    result = await db.execute(select(Game).where(
+        Game.id == game_id,
+        Game.user_id == user_id
+    ))
+    return result.scalar_one_or_none()
+
+
+def _game_info(game: Game) -> Dict:
+    """Describe a game for API responses"""
+    return {
+        'id': game.id,
+        'lichess_id': game.lichess_game_id,
+        'time_control': game.time_control,
+        'result': game.result,
+        'opening': game.opening_name,
+        'user_rating': game.user_rating,
+        'opponent_rating': game.opponent_rating
+    }
+
+
+async def _summarize_analysis(game_id: int, db: AsyncSession) -> Dict:
+    """Aggregate a game's move analysis in the database"""
+    result = await db.execute(select(
+        func.count().label('total_moves'),
+        func.count().filter(GameAnalysis.move_quality == 'blunder').label('blunders'),
+        func.count().filter(GameAnalysis.move_quality == 'mistake').label('mistakes'),
+        func.count().filter(GameAnalysis.move_quality == 'inaccuracy').label('inaccuracies'),
+        func.coalesce(func.avg(GameAnalysis.eval_loss), 0).label('avg_eval_loss')
+    ).where(GameAnalysis.game_id == game_id))
+    summary = result.one()
+    
+    avg_eval_loss = float(summary.avg_eval_loss)
+    accuracy_score = max(0, 100 - (avg_eval_loss / 2))
+    
+    return {
+        'total_moves': summary.total_moves,
+        'blunders': summary.blunders,
+        'mistakes': summary.mistakes,
+        'inaccuracies': summary.inaccuracies,
+        'average_eval_loss': round(avg_eval_loss, 2),
+        'accuracy_score': round(accuracy_score, 1)
+    }
+
+
+async def _analysis_moves(
+    game_id: int, db: AsyncSession, offset: int = 0, limit: Optional[int] = None
+) -> List[Dict]:
+    """Get per-move analysis for a game in move order"""
+    result = await db.execute(select(
+        GameAnalysis.move_number,
+        GameAnalysis.move_played,
+        GameAnalysis.best_move,
+        GameAnalysis.stockfish_eval,
+        GameAnalysis.eval_loss,
+        GameAnalysis.move_quality,
+        GameAnalysis.time_spent,
+        GameAnalysis.game_phase
+    ).where(
+        GameAnalysis.game_id == game_id
+    ).order_by(GameAnalysis.move_number).offset(offset).limit(limit))
+    
+    return [
+        {
+            'move_number': a.move_number,
+            'move_played': a.move_played,
+            'best_move': a.best_move,
+            'evaluation': a.stockfish_eval,
+            'eval_loss': a.eval_loss,
+            'quality': a.move_quality,
+            'time_spent': a.time_spent,
+            'phase': a.game_phase
+        }
+        for a in result
+    ]
+
+
+async def get_game_analysis(game_id: int, user_id: int, db: AsyncSession) -> Optional[Dict]:
     """Get analysis for a specific game"""
     try:
-        # Get game with analysis
-        game = db.query(Game).filter(
-            Game.id == game_id,
-            Game.user_id == user_id
-        ).first()
+        cache_key = _game_analysis_cache_key(game_id, user_id)
+        cached = await aget_cache(cache_key)
+        if cached:
+            return cached
         
+        game = await _get_user_game(game_id, user_id, db)
         if not game:
             return None
         
-        # Get analysis data
-        analysis_data = db.query(GameAnalysis).filter(
-            GameAnalysis.game_id == game_id
-        ).order_by(GameAnalysis.move_number).all()
+        analysis = {
+            'game_info': _game_info(game),
+            'analysis': await _analysis_moves(game_id, db),
+            'summary': await _summarize_analysis(game_id, db)
+        }
+        
+        # Only completed analyses are stable enough to cache
+        if game.analyzed:
+            await aset_cache(cache_key, analysis, expire=GAME_ANALYSIS_CACHE_TTL)
         
-        # Calculate summary statistics
-        total_moves = len(analysis_data)
-        blunders = sum(1 for a in analysis_data if a.move_quality == 'blunder')
-        mistakes = sum(1 for a in analysis_data if a.move_quality == 'mistake')
-        inaccuracies = sum(1 for a in analysis_data if a.move_quality == 'inaccuracy')
+        return analysis
         
-        avg_eval_loss = sum(a.eval_loss for a in analysis_data) / total_moves if total_moves > 0 else 0
-        accuracy_score = max(0, 100 - (avg_eval_loss / 2))
+    except Exception as e:
+        logger.error(f"Failed to get game analysis for game {game_id}", error=str(e))
+        return None
+
+
+async def get_game_analysis_summary(game_id: int, user_id: int, db: AsyncSession) -> Optional[Dict]:
+    """Get summary statistics for a specific game's analysis"""
+    try:
+        # A cached full analysis already carries the summary
+        cached = await aget_cache(_game_analysis_cache_key(game_id, user_id))
+        if cached:
+            return {'game_info': cached['game_info'], 'summary': cached['summary']}
+        
+        game = await _get_user_game(game_id, user_id, db)
+        if not game:
+            return None
         
         return {
-            'game_info': {
-                'id': game.id,
-                'lichess_id': game.lichess_game_id,
-                'time_control': game.time_control,
-                'result': game.result,
-                'opening': game.opening_name,
-                'user_rating': game.user_rating,
-                'opponent_rating': game.opponent_rating
-            },
-            'analysis': [
-                {
-                    'move_number': a.move_number,
-                    'move_played': a.move_played,
-                    'best_move': a.best_move,
-                    'evaluation': a.stockfish_eval,
-                    'eval_loss': a.eval_loss,
-                    'quality': a.move_quality,
-                    'time_spent': a.time_spent,
-                    'phase': a.game_phase
-                }
-                for a in analysis_data
-            ],
-            'summary': {
-                'total_moves': total_moves,
-                'blunders': blunders,
-                'mistakes': mistakes,
-                'inaccuracies': inaccuracies,
-                'average_eval_loss': round(avg_eval_loss, 2),
-                'accuracy_score': round(accuracy_score, 1)
-            }
+            'game_info': _game_info(game),
+            'summary': await _summarize_analysis(game_id, db)
         }
         
     except Exception as e:
-        logger.error(f"Failed to get game analysis for game {game_id}", error=str(e))
+        logger.error(f"Failed to get analysis summary for game {game_id}", error=str(e))
+        return None
+
+
+async def get_game_analysis_moves(
+    game_id: int, user_id: int, db: AsyncSession, offset: int = 0, limit: int = 100
+) -> Optional[List[Dict]]:
+    """Get a page of per-move analysis for a specific game"""
+    try:
+        game = await _get_user_game(game_id, user_id, db)
+        if not game:
+            return None
+        
+        return await _analysis_moves(game_id, db, offset, limit)
+        
+    except Exception as e:
+        logger.error(f"Failed to get analysis moves for game {game_id}", error=str(e))
         return None
@@ -1,52 +1,88 @@
 import httpx
-import json
+import orjson
 import structlog
+import threading
+from celery import group
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
 
 from app.config import settings
 from app.database.models import User, Game, AnalysisProgress
-from app.core.celery_app import celery_app
+from app.core.celery_app import celery_app, run_async
 from app.core.redis_client import update_analysis_progress
 
 logger = structlog.get_logger()
 
+# Games analyzed per Celery task; amortizes session and engine setup
+ANALYSIS_BATCH_SIZE = 20
 
-class LichessService:
-    def __init__(self):
-        self.base_url = settings.lichess_api_base_url
-        self.headers = {
+
+def create_lichess_client() -> httpx.AsyncClient:
+    """Create a pooled HTTP/2 client for the Lichess API"""
+    return httpx.AsyncClient(
+        http2=True,
+        base_url=settings.lichess_api_base_url,
+        headers={
             "User-Agent": settings.lichess_user_agent,
             "Accept": "application/json"
-        }
+        },
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        timeout=60,
+    )
+
+
+# Celery workers keep one client per worker thread, alongside the
+# thread's persistent event loop
+_worker_clients = threading.local()
+
+
+def get_lichess_client() -> httpx.AsyncClient:
+    """Get this worker thread's shared Lichess client"""
+    client = getattr(_worker_clients, "client", None)
+    if client is None:
+        client = _worker_clients.client = create_lichess_client()
+    return client
+
+
+async def close_lichess_client() -> None:
+    """Close this worker thread's Lichess client if one was created"""
+    client = getattr(_worker_clients, "client", None)
+    if client is not None:
+        _worker_clients.client = None
+        await client.aclose()
+
+
+class LichessService:
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        self.client = client or get_lichess_client()
     
-    async def fetch_user_games(self, username: str, max_games: int = 100) -> List[Dict]:
-        """Fetch user's recent games from Lichess"""
+    async def stream_user_games(self, username: str, max_games: int = 100) -> AsyncIterator[Dict]:
+        """Stream user's recent games from Lichess, parsing each as it arrives"""
         try:
-            url = f"{self.base_url}/games/user/{username}"
+            url = f"/games/user/{username}"
             params = {
                 'max': max_games,
                 'rated': 'true',
                 'perfType': 'blitz,rapid,classical',
-                'format': 'json',
+                'pgnInJson': 'true',
                 'clocks': 'true',
                 'evals': 'false',  # We'll do our own analysis
                 'opening': 'true'
             }
+            headers = {"Accept": "application/x-ndjson"}
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params, headers=self.headers)
+            count = 0
+            async with self.client.stream("GET", url, params=params, headers=headers) as response:
                 response.raise_for_status()
                 
-                games = []
-                for line in response.text.strip().split('\n'):
+                async for line in response.aiter_lines():
                     if line:
-                        game_data = json.loads(line)
-                        games.append(self._parse_game_data(game_data, username))
-                
-                logger.info(f"Fetched {len(games)} games from Lichess", username=username)
-                return games
+                        count += 1
+                        yield self._parse_game_data(orjson.loads(line), username)
+            
+            logger.info(f"Fetched {count} games from Lichess", username=username)
                 
         except httpx.HTTPStatusError as e:
             logger.error(f"Lichess API error: {e.response.status_code}", username=username)
@@ -55,6 +91,10 @@ class LichessService:
             logger.error(f"Failed to fetch games from Lichess", error=str(e), username=username)
             raise
     
+    async def fetch_user_games(self, username: str, max_games: int = 100) -> List[Dict]:
+        """Fetch user's recent games from Lichess"""
+        return [game async for game in self.stream_user_games(username, max_games)]
+    
     def _parse_game_data(self, game_data: Dict, username: str) -> Dict:
         """Parse Lichess game data into our format"""
         # Determine user color and opponent
@@ -104,24 +144,23 @@ class LichessService:
     async def fetch_user_profile(self, username: str) -> Optional[Dict]:
         """Fetch user profile from Lichess"""
         try:
-            url = f"{self.base_url}/user/{username}"
+            url = f"/user/{username}"
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, headers=self.headers)
-                response.raise_for_status()
-                
-                profile_data = response.json()
-                logger.info(f"Fetched profile for {username}")
-                
-                return {
-                    'username': profile_data.get('id'),
-                    'rating_blitz': profile_data.get('perfs', {}).get('blitz', {}).get('games', 0),
-                    'rating_rapid': profile_data.get('perfs', {}).get('rapid', {}).get('games', 0),
-                    'rating_classical': profile_data.get('perfs', {}).get('classical', {}).get('games', 0),
-                    'created_at': profile_data.get('createdAt'),
-                    'seen_at': profile_data.get('seenAt'),
-                    'play_time': profile_data.get('playTime', {}).get('total', 0)
-                }
+            response = await self.client.get(url)
+            response.raise_for_status()
+            
+            profile_data = orjson.loads(response.content)
+            logger.info(f"Fetched profile for {username}")
+            
+            return {
+                'username': profile_data.get('id'),
+                'rating_blitz': profile_data.get('perfs', {}).get('blitz', {}).get('games', 0),
+                'rating_rapid': profile_data.get('perfs', {}).get('rapid', {}).get('games', 0),
+                'rating_classical': profile_data.get('perfs', {}).get('classical', {}).get('games', 0),
+                'created_at': profile_data.get('createdAt'),
+                'seen_at': profile_data.get('seenAt'),
+                'play_time': profile_data.get('playTime', {}).get('total', 0)
+            }
                 
         except httpx.HTTPStatusError as e:
             logger.error(f"Failed to fetch profile for {username}: {e.response.status_code}")
@@ -150,49 +189,62 @@ def fetch_user_games_task(self, user_id: int, lichess_username: str):
         })
         
         # Fetch games from Lichess
-        games_data = lichess_service.fetch_user_games(lichess_username, max_games=500)
+        games_data = run_async(lichess_service.fetch_user_games(lichess_username, max_games=500))
+        
+        # Skip games already stored, checked with a single IN query
+        lichess_ids = [game_data['lichess_id'] for game_data in games_data]
+        existing_ids = set(db.scalars(
+            select(Game.lichess_game_id).where(Game.lichess_game_id.in_(lichess_ids))
+        ).all())
+        new_games = {
+            game_data['lichess_id']: game_data
+            for game_data in games_data
+            if game_data['lichess_id'] not in existing_ids
+        }
         
         # Store games in database
-        stored_games = []
-        for game_data in games_data:
-            # Check if game already exists
-            existing_game = db.query(Game).filter(
-                Game.lichess_game_id == game_data['lichess_id']
-            ).first()
-            
-            if not existing_game:
-                game = Game(
-                    user_id=user_id,
-                    lichess_game_id=game_data['lichess_id'],
-                    pgn=game_data['pgn'],
-                    time_control=game_data['time_control'],
-                    user_color=game_data['user_color'],
-                    user_rating=game_data['user_rating'],
-                    opponent_rating=game_data['opponent_rating'],
-                    result=game_data['result'],
-                    opening_eco=game_data['opening_eco'],
-                    opening_name=game_data['opening_name'],
-                    played_at=game_data['played_at']
-                )
-                db.add(game)
-                stored_games.append(game)
+        stored_game_ids = []
+        if new_games:
+            stored_game_ids = db.scalars(
+                insert(Game).returning(Game.id),
+                [
+                    {
+                        'user_id': user_id,
+                        'lichess_game_id': game_data['lichess_id'],
+                        'pgn': game_data['pgn'],
+                        'time_control': game_data['time_control'],
+                        'user_color': game_data['user_color'],
+                        'user_rating': game_data['user_rating'],
+                        'opponent_rating': game_data['opponent_rating'],
+                        'result': game_data['result'],
+                        'opening_eco': game_data['opening_eco'],
+                        'opening_name': game_data['opening_name'],
+                        'played_at': game_data['played_at']
+                    }
+                    for game_data in new_games.values()
+                ]
+            ).all()
         
         db.commit()
         
         # Update progress
         update_analysis_progress(user_id, {
             'status': 'analyzing',
-            'games_total': len(stored_games),
+            'games_total': len(stored_game_ids),
             'games_completed': 0,
+            'games_failed': 0,
             'percentage': 0
         })
         
-        # Trigger analysis for all games
-        from app.services.analysis_service import analyze_game_task
-        for game in stored_games:
-            analyze_game_task.delay(game.id)
+        # Trigger analysis for all games, a batch per task
+        from app.services.analysis_service import analyze_games_task
+        if stored_game_ids:
+            group(
+                analyze_games_task.s(stored_game_ids[i:i + ANALYSIS_BATCH_SIZE])
+                for i in range(0, len(stored_game_ids), ANALYSIS_BATCH_SIZE)
+            ).apply_async()
         
-        logger.info(f"Fetched and queued {len(stored_games)} games for analysis", 
+        logger.info(f"Fetched and queued {len(stored_game_ids)} games for analysis", 
                    user_id=user_id, lichess_username=lichess_username)
         
     except Exception as e:
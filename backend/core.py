@@ -5,23 +5,45 @@ import asyncio
 import chess
 import chess.pgn
 import chess.engine
-import requests
-import json
+import chess.polyglot
+import aiohttp
+import orjson
+import csv
 import io
+import os
+import struct
+import threading
+import time
+import hashlib
+import msgpack
+import numpy as np
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Float, Text, ForeignKey
+from enum import IntEnum
+from functools import lru_cache
+from sqlalchemy import create_engine, select, insert, func, Column, Integer, SmallInteger, String, Boolean, DateTime, Float, Text, LargeBinary, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, relationship, defer
 from celery import Celery
-import redis
+import redis.asyncio as aioredis
 import jwt
 from passlib.context import CryptContext
 
 # Database Models
 Base = declarative_base()
 
+class MoveQuality(IntEnum):
+    EXCELLENT = 0
+    GOOD = 1
+    INACCURACY = 2
+    MISTAKE = 3
+    BLUNDER = 4
+    
+    @property
+    def label(self) -> str:
+        return self.name.lower()
+
 class User(Base):
     __tablename__ = 'users'
     
@@ -60,24 +82,101 @@ class GameAnalysis(Base):
     id = Column(Integer, primary_key=True)
     game_id = Column(Integer, ForeignKey('games.id'))
     move_number = Column(Integer)
-    position_fen = Column(String(100))
+    position = Column(LargeBinary(32))  # pack_position()
     stockfish_eval = Column(Float)
     move_played = Column(String(10))
     best_move = Column(String(10))
     eval_loss = Column(Float)
-    move_quality = Column(String(20))  # 'excellent', 'good', 'inaccuracy', 'mistake', 'blunder'
+    move_quality = Column(SmallInteger, index=True)  # MoveQuality
     time_spent = Column(Float)
     game_phase = Column(String(20))  # 'opening', 'middlegame', 'endgame'
     
     game = relationship("Game", back_populates="analysis")
+    
+    def to_board(self) -> chess.Board:
+        return unpack_position(self.position)
+
+# Packed positions: turn + castling byte, en passant byte, the 64-bit
+# occupancy mask, then one nibble (color << 3 | piece type) per occupied
+# square in square order. At most 26 bytes versus a 60-80 byte FEN.
+_CASTLING_SQUARES = (chess.A1, chess.H1, chess.A8, chess.H8)
+_NO_EP = 0xFF
+
+def pack_position(board: chess.Board) -> bytes:
+    """Pack a position into a compact binary form"""
+    meta = int(board.turn)
+    for bit, square in enumerate(_CASTLING_SQUARES):
+        if board.castling_rights & chess.BB_SQUARES[square]:
+            meta |= 2 << bit
+    ep = board.ep_square if board.ep_square is not None else _NO_EP
+    
+    nibbles = [
+        board.piece_type_at(square) | (int(board.color_at(square)) << 3)
+        for square in chess.scan_forward(board.occupied)
+    ]
+    if len(nibbles) % 2:
+        nibbles.append(0)
+    pieces = bytes(lo | (hi << 4) for lo, hi in zip(nibbles[::2], nibbles[1::2]))
+    
+    return struct.pack('<BBQ', meta, ep, board.occupied) + pieces
+
+def unpack_position(data: bytes) -> chess.Board:
+    """Rebuild a board from pack_position() output"""
+    meta, ep, occupied = struct.unpack_from('<BBQ', data)
+    board = chess.Board.empty()
+    
+    pieces = data[10:]
+    for i, square in enumerate(chess.scan_forward(occupied)):
+        nibble = (pieces[i >> 1] >> (4 * (i & 1))) & 0xF
+        board.set_piece_at(square, chess.Piece(nibble & 7, bool(nibble >> 3)))
+    
+    board.turn = bool(meta & 1)
+    board.castling_rights = chess.BB_EMPTY
+    for bit, square in enumerate(_CASTLING_SQUARES):
+        if meta & (2 << bit):
+            board.castling_rights |= chess.BB_SQUARES[square]
+    board.ep_square = None if ep == _NO_EP else ep
+    return board
+
+# Database Session
+DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://localhost:5432/chess_analysis")
+engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
+
+# Redis: one connection pool shared by the whole process
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS = aioredis.Redis.from_url(REDIS_URL, max_connections=64)
+
+# Timestamps are reported at one-second resolution, so format each
+# second once rather than on every progress update and response
+@lru_cache(maxsize=1)
+def _iso_second(second: int) -> str:
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(second))
+
+def iso_now() -> str:
+    """Current UTC time as an ISO 8601 string"""
+    return _iso_second(int(time.time()))
 
 # Lichess API Client
+# One aiohttp session per process, reused for every Lichess request
+_http_session: Optional[aiohttp.ClientSession] = None
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Get the shared aiohttp session, creating it on first use"""
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(
+            headers={'User-Agent': 'ChessAnalysisPlatform/1.0'},
+            timeout=aiohttp.ClientTimeout(total=None, sock_read=60)
+        )
+    return _http_session
+
 class LichessClient:
     BASE_URL = "https://lichess.org/api"
     
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({'User-Agent': 'ChessAnalysisPlatform/1.0'})
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        return get_http_session()
     
     async def fetch_user_games(self, username: str, max_games: int = 100) -> List[Dict]:
         """Fetch user's recent games from Lichess"""
@@ -86,20 +185,19 @@ class LichessClient:
             'max': max_games,
             'rated': 'true',
             'perfType': 'blitz,rapid,classical',
-            'format': 'json',
+            'pgnInJson': 'true',
             'clocks': 'true',
             'evals': 'false',  # We'll do our own analysis
             'opening': 'true'
         }
         
-        # Note: In real implementation, use aiohttp for async requests
-        response = self.session.get(url, params=params, stream=True)
+        # Stream the NDJSON export, parsing each game as its line arrives
         games = []
-        
-        for line in response.iter_lines():
-            if line:
-                game_data = json.loads(line.decode('utf-8'))
-                games.append(self._parse_game_data(game_data))
+        async with self.session.get(url, params=params, headers={'Accept': 'application/x-ndjson'}) as response:
+            response.raise_for_status()
+            async for line in response.content:
+                if line.strip():
+                    games.append(self._parse_game_data(orjson.loads(line)))
         
         return games
     
@@ -118,11 +216,91 @@ class LichessClient:
             'played_at': datetime.fromtimestamp(game_data['createdAt'] / 1000)
         }
 
+# The client holds no state of its own, so every task shares one
+LICHESS = LichessClient()
+
 # Chess Analysis Engine
+# Position evaluations are shared across games and users
+EVAL_CACHE_TTL = 30 * 24 * 3600  # 30 days
+
+# Single-threaded engines, one per core: independent games parallelize
+# better than one deep search. Each engine's hash still covers a game.
+# A task analyzes one game on one engine, so each prefork worker process
+# keeps a single engine; worker concurrency supplies the one-per-core.
+ENGINE_THREADS = 1
+ENGINES_PER_WORKER = 1
+ENGINE_HASH_MB = 128
+
+# Upper bounds (inclusive) of eval loss for each MoveQuality below BLUNDER
+MOVE_QUALITY_THRESHOLDS = np.array([10, 25, 50, 100], dtype=np.float32)
+
+class EnginePool:
+    """Pre-spawned Stockfish processes handed out to idle callers"""
+    
+    def __init__(self, stockfish_path: str, size: int):
+        self.stockfish_path = stockfish_path
+        self.size = size
+        self._idle: asyncio.Queue = asyncio.Queue()
+    
+    async def _spawn(self) -> chess.engine.UciProtocol:
+        _, engine = await chess.engine.popen_uci(self.stockfish_path)
+        await engine.configure({"Hash": ENGINE_HASH_MB, "Threads": ENGINE_THREADS})
+        return engine
+    
+    async def start(self):
+        for _ in range(self.size):
+            self._idle.put_nowait(await self._spawn())
+    
+    async def acquire(self) -> chess.engine.UciProtocol:
+        engine = await self._idle.get()
+        if engine.returncode.done():  # Process died; replace it
+            engine = await self._spawn()
+        return engine
+    
+    def release(self, engine: chess.engine.UciProtocol):
+        self._idle.put_nowait(engine)
+
+# One pool per worker process, started on first use
+_engine_pool: Optional[EnginePool] = None
+_engine_pool_lock = asyncio.Lock()
+
+async def get_engine_pool(stockfish_path: str) -> EnginePool:
+    """Get this worker's engine pool, starting it if needed"""
+    global _engine_pool
+    async with _engine_pool_lock:
+        if _engine_pool is None:
+            pool = EnginePool(stockfish_path, size=ENGINES_PER_WORKER)
+            await pool.start()
+            _engine_pool = pool
+    return _engine_pool
+
+class AnalysisSession:
+    """Exclusive use of a pooled engine for one game's positions"""
+    
+    def __init__(self, stockfish_path: str, game_id: int):
+        self.stockfish_path = stockfish_path
+        self.game_id = game_id
+        self.pool: Optional[EnginePool] = None
+        self.engine: Optional[chess.engine.UciProtocol] = None
+    
+    async def __aenter__(self) -> "AnalysisSession":
+        self.pool = await get_engine_pool(self.stockfish_path)
+        self.engine = await self.pool.acquire()
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        self.pool.release(self.engine)
+        self.engine = None
+    
+    async def analyse(self, board: chess.Board, limit: chess.engine.Limit) -> Dict:
+        # The board is sent as start position + moves, and ucinewgame only
+        # goes out when game_id changes, so the hash stays warm across moves
+        return await self.engine.analyse(board, limit, game=self.game_id)
+
 class ChessAnalysisEngine:
     def __init__(self, stockfish_path: str = "/usr/local/bin/stockfish"):
         self.stockfish_path = stockfish_path
-        self.redis_client = redis.Redis(host='localhost', port=6379, db=0)
+        self.redis_client = REDIS
     
     async def analyze_game(self, game: Game) -> List[Dict]:
         """Comprehensive game analysis"""
@@ -132,74 +310,112 @@ class ChessAnalysisEngine:
         
         analysis_results = []
         move_times = self._extract_move_times(chess_game)
+        limit = chess.engine.Limit(time=0.1, depth=15)
         
-        async with chess.engine.SimpleEngine.popen_uci(self.stockfish_path) as engine:
-            for i, move in enumerate(chess_game.mainline_moves()):
-                # Analyze position before move
-                pre_analysis = await engine.analyse(
-                    board, 
-                    chess.engine.Limit(time=0.1, depth=15),
-                    multipv=3
-                )
-                
-                # Get best move and evaluation
-                best_move = pre_analysis['pv'][0][0] if pre_analysis['pv'] else None
-                pre_eval = self._score_to_centipawns(pre_analysis['score'].white())
-                
-                # Make the actual move
-                board.push(move)
-                
-                # Analyze position after move
-                post_analysis = await engine.analyse(
-                    board, 
-                    chess.engine.Limit(time=0.1, depth=15)
-                )
-                post_eval = self._score_to_centipawns(post_analysis['score'].white())
-                
-                # Calculate move quality
-                eval_loss = abs(post_eval - pre_eval)
-                if board.turn == chess.BLACK:  # Adjust for black's perspective
-                    eval_loss = abs(-post_eval - (-pre_eval))
-                
-                move_quality = self._categorize_move_quality(eval_loss)
-                game_phase = self._determine_game_phase(board)
-                
-                analysis_results.append({
-                    'move_number': i + 1,
-                    'position_fen': board.fen(),
-                    'move_played': str(move),
-                    'best_move': str(best_move) if best_move else None,
-                    'stockfish_eval': post_eval,
-                    'eval_loss': eval_loss,
-                    'move_quality': move_quality,
-                    'time_spent': move_times.get(i, 0),
-                    'game_phase': game_phase
-                })
+        moves = list(chess_game.mainline_moves())
+        if not moves:
+            return analysis_results
+        positions = [board.copy()]
+        for move in moves:
+            board.push(move)
+            positions.append(board.copy())
+        
+        # Search every position first, back to back, so the engine never
+        # waits on Python-side scoring; each position serves as the
+        # position after one move and before the next
+        async with AnalysisSession(self.stockfish_path, game.id) as session:
+            evaluations = await self._evaluate_positions(session, positions, limit)
+        
+        for i, move in enumerate(moves):
+            board = positions[i + 1]
+            best_move, pre_eval = evaluations[i]
+            
+            # Playing the engine's move keeps its evaluation
+            post_eval = pre_eval if move == best_move else evaluations[i + 1][1]
+            
+            # Calculate move quality
+            eval_loss = abs(post_eval - pre_eval)
+            if board.turn == chess.BLACK:  # Adjust for black's perspective
+                eval_loss = abs(-post_eval - (-pre_eval))
+            
+            game_phase = self._determine_game_phase(board)
+            
+            analysis_results.append({
+                'move_number': i + 1,
+                'position': pack_position(board),
+                'move_played': str(move),
+                'best_move': str(best_move) if best_move else None,
+                'stockfish_eval': post_eval,
+                'eval_loss': eval_loss,
+                'time_spent': move_times.get(i, 0),
+                'game_phase': game_phase
+            })
+        
+        # Categorize every move of the game in one vectorized pass
+        eval_losses = np.fromiter((r['eval_loss'] for r in analysis_results), dtype=np.float32, count=len(analysis_results))
+        for result, code in zip(analysis_results, self._categorize_move_qualities(eval_losses).tolist()):
+            result['move_quality'] = code
         
         return analysis_results
     
+    async def _evaluate_positions(self, session: AnalysisSession, positions: List[chess.Board], limit: chess.engine.Limit) -> List[Tuple[Optional[chess.Move], float]]:
+        """Get best move and evaluation for each position, from the eval cache when possible"""
+        keys = [f"eval:{self._position_key(board)}:d15" for board in positions]
+        
+        # One round trip for every cached position in the game; if Redis
+        # is unavailable every position is simply a cache miss
+        entries = {}
+        try:
+            cached_entries = await self.redis_client.mget(keys)
+        except aioredis.RedisError:
+            cached_entries = [None] * len(keys)
+        for key, cached in zip(keys, cached_entries):
+            if cached:
+                entries[key] = msgpack.unpackb(cached)
+        
+        searched = {}
+        for key, board in zip(keys, positions):
+            if key in entries:
+                continue
+            analysis = await session.analyse(board, limit)
+            best_move = analysis['pv'][0] if analysis.get('pv') else None
+            entries[key] = searched[key] = {
+                'score_cp': self._score_to_centipawns(analysis['score'].white()),
+                'best_move_uci': best_move.uci() if best_move else None
+            }
+        
+        if searched:
+            try:
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    for key, entry in searched.items():
+                        pipe.setex(key, EVAL_CACHE_TTL, msgpack.packb(entry))
+                    await pipe.execute()
+            except aioredis.RedisError:
+                pass  # Results are still returned; they just aren't cached
+        
+        return [
+            (chess.Move.from_uci(entry['best_move_uci']) if entry['best_move_uci'] else None, entry['score_cp'])
+            for entry in (entries[key] for key in keys)
+        ]
+    
+    def _position_key(self, board: chess.Board) -> str:
+        """Hash a position (pieces, side to move, castling, en passant) for cache keys"""
+        zobrist = chess.polyglot.zobrist_hash(board)
+        return hashlib.blake2b(zobrist.to_bytes(8, 'little'), digest_size=16).hexdigest()
+    
     def _score_to_centipawns(self, score) -> float:
         """Convert Stockfish score to centipawns"""
         if score.is_mate():
             return 10000 if score.mate() > 0 else -10000
         return float(score.score())
     
-    def _categorize_move_quality(self, eval_loss: float) -> str:
-        """Categorize move quality based on evaluation loss"""
-        if eval_loss <= 10:
-            return 'excellent'
-        elif eval_loss <= 25:
-            return 'good'
-        elif eval_loss <= 50:
-            return 'inaccuracy'
-        elif eval_loss <= 100:
-            return 'mistake'
-        else:
-            return 'blunder'
+    def _categorize_move_qualities(self, eval_losses: np.ndarray) -> np.ndarray:
+        """Categorize move quality for a batch of evaluation losses as MoveQuality codes"""
+        return np.searchsorted(MOVE_QUALITY_THRESHOLDS, eval_losses, side='left').astype(np.uint8)
     
     def _determine_game_phase(self, board: chess.Board) -> str:
         """Determine current game phase"""
-        piece_count = len(board.piece_map())
+        piece_count = board.occupied.bit_count()
         
         if piece_count > 28:
             return 'opening'
@@ -209,10 +425,24 @@ class ChessAnalysisEngine:
             return 'endgame'
     
     def _extract_move_times(self, game) -> Dict[int, float]:
-        """Extract time spent on each move from PGN"""
+        """Extract time spent on each move from PGN clock comments"""
         move_times = {}
-        # Parse clock times from PGN comments
-        # Implementation depends on PGN format
+        base, _, increment = game.headers.get('TimeControl', '').partition('+')
+        try:
+            base, increment = float(base), float(increment or 0)
+        except ValueError:  # Correspondence or unknown time control
+            return move_times
+        
+        # python-chess already parses [%clk] comments; the time spent is the
+        # drop in the mover's clock since their last move, plus increment
+        clocks = {chess.WHITE: base, chess.BLACK: base}
+        for i, node in enumerate(game.mainline()):
+            clock = node.clock()
+            if clock is None:
+                continue
+            mover = not node.turn()
+            move_times[i] = max(0.0, clocks[mover] - clock + increment)
+            clocks[mover] = clock
         return move_times
 
 # Celery Configuration
@@ -222,24 +452,49 @@ celery_app = Celery(
     backend='redis://localhost:6379/0'
 )
 
-@celery_app.task
-async def fetch_and_store_games(user_id: int, lichess_username: str):
+# Celery runs task bodies synchronously, so each async body is submitted
+# to one event loop per worker process, running in its own thread. The
+# Redis pool, HTTP session and engine pool bind to the loop that first uses
+# them, so every worker thread must share that loop; asyncio.run() would
+# also close it after every task, orphaning them.
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+_worker_loop_lock = threading.Lock()
+
+def _get_worker_loop() -> asyncio.AbstractEventLoop:
+    """Get this process's task event loop, starting it on first use"""
+    global _worker_loop
+    with _worker_loop_lock:
+        if _worker_loop is None or _worker_loop.is_closed():
+            _worker_loop = asyncio.new_event_loop()
+            threading.Thread(target=_worker_loop.run_forever, name='task-event-loop', daemon=True).start()
+    return _worker_loop
+
+def run_async(coro):
+    """Run a coroutine to completion on this process's task event loop"""
+    return asyncio.run_coroutine_threadsafe(coro, _get_worker_loop()).result()
+
+@celery_app.task(name='fetch_and_store_games')
+def fetch_and_store_games(user_id: int, lichess_username: str):
     """Background task to fetch and store user games"""
-    lichess_client = LichessClient()
-    games_data = await lichess_client.fetch_user_games(lichess_username, max_games=500)
+    run_async(_fetch_and_store_games(user_id, lichess_username))
+
+async def _fetch_and_store_games(user_id: int, lichess_username: str):
+    games_data = await LICHESS.fetch_user_games(lichess_username, max_games=500)
     
     # Store games in database
-    for game_data in games_data:
-        await store_game_in_db(user_id, game_data)
+    game_ids = await store_games_in_db(user_id, lichess_username, games_data)
     
-    # Trigger analysis for all games
-    game_ids = await get_user_game_ids(user_id)
+    # Trigger analysis for the newly stored games
     for game_id in game_ids:
         analyze_game_task.delay(game_id)
 
-@celery_app.task
-async def analyze_game_task(game_id: int):
+@celery_app.task(name='analyze_game')
+def analyze_game_task(game_id: int):
     """Background task to analyze a single game"""
+    run_async(_analyze_game(game_id))
+
+async def _analyze_game(game_id: int):
+    game = None
     try:
         game = await get_game_by_id(game_id)
         analysis_engine = ChessAnalysisEngine()
@@ -260,7 +515,8 @@ async def analyze_game_task(game_id: int):
         await update_analysis_progress(game.user_id, game_id, 'completed')
         
     except Exception as e:
-        await update_analysis_progress(game.user_id, game_id, 'failed')
+        if game is not None:
+            await update_analysis_progress(game.user_id, game_id, 'failed')
         raise e
 
 # Insights Generator
@@ -270,11 +526,14 @@ class InsightsGenerator:
     
     async def generate_user_insights(self, user_id: int) -> Dict:
         """Generate comprehensive insights for a user"""
-        games = await get_user_games_with_analysis(user_id)
+        # Move-level statistics are aggregated in the database; only the
+        # game rows themselves are loaded for the game-level insights
+        games = await get_user_games(user_id)
+        move_stats = await get_user_move_stats(user_id)
         
         insights = {
-            'overall_stats': self._calculate_overall_stats(games),
-            'performance_by_phase': self._analyze_phase_performance(games),
+            'overall_stats': self._calculate_overall_stats(move_stats.get('overall')),
+            'performance_by_phase': self._analyze_phase_performance(move_stats),
             'time_management': self._analyze_time_management(games),
             'opening_repertoire': self._analyze_opening_performance(games),
             'improvement_trends': self._calculate_improvement_trends(games),
@@ -284,47 +543,40 @@ class InsightsGenerator:
         
         return insights
     
-    def _calculate_overall_stats(self, games: List[Game]) -> Dict:
+    def _calculate_overall_stats(self, stats: Optional[Dict]) -> Dict:
         """Calculate overall performance statistics"""
-        if not games:
+        if not stats:
             return {}
         
-        analyzed_games = [g for g in games if g.analyzed]
-        total_moves = sum(len(g.analysis) for g in analyzed_games)
-        
-        blunders = sum(1 for g in analyzed_games for a in g.analysis if a.move_quality == 'blunder')
-        mistakes = sum(1 for g in analyzed_games for a in g.analysis if a.move_quality == 'mistake')
-        inaccuracies = sum(1 for g in analyzed_games for a in g.analysis if a.move_quality == 'inaccuracy')
-        
-        avg_eval_loss = sum(a.eval_loss for g in analyzed_games for a in g.analysis) / total_moves if total_moves > 0 else 0
+        games_analyzed = stats['games']
         
         return {
-            'games_analyzed': len(analyzed_games),
-            'total_moves': total_moves,
-            'avg_eval_loss': round(avg_eval_loss, 2),
-            'blunders_per_game': round(blunders / len(analyzed_games), 2) if analyzed_games else 0,
-            'mistakes_per_game': round(mistakes / len(analyzed_games), 2) if analyzed_games else 0,
-            'accuracy_score': self._calculate_accuracy_score(analyzed_games)
+            'games_analyzed': games_analyzed,
+            'total_moves': stats['moves'],
+            'avg_eval_loss': round(stats['avg_eval_loss'], 2),
+            'blunders_per_game': round(stats['blunders'] / games_analyzed, 2) if games_analyzed else 0,
+            'mistakes_per_game': round(stats['mistakes'] / games_analyzed, 2) if games_analyzed else 0,
+            'accuracy_score': round(stats['accuracy'], 1)
         }
     
-    def _calculate_accuracy_score(self, games: List[Game]) -> float:
-        """Calculate overall accuracy score (0-100)"""
-        if not games:
-            return 0
-        
-        total_moves = 0
-        total_accuracy = 0
-        
-        for game in games:
-            for analysis in game.analysis:
-                # Accuracy based on evaluation loss
-                move_accuracy = max(0, 100 - (analysis.eval_loss / 2))
-                total_accuracy += move_accuracy
-                total_moves += 1
-        
-        return round(total_accuracy / total_moves, 1) if total_moves > 0 else 0
-
+    def _analyze_phase_performance(self, phase_stats: Dict[str, Dict]) -> Dict:
+        """Summarize accuracy and errors per game phase"""
+        performance = {}
+        for phase in ('opening', 'middlegame', 'endgame'):
+            stats = phase_stats.get(phase)
+            if not stats:
+                performance[f'{phase}_accuracy'] = 0
+                performance[f'{phase}_avg_eval_loss'] = 0
+                performance[f'{phase}_blunders'] = 0
+                continue
+            performance[f'{phase}_accuracy'] = round(stats['accuracy'], 1)
+            performance[f'{phase}_avg_eval_loss'] = round(stats['avg_eval_loss'], 2)
+            performance[f'{phase}_blunders'] = stats['blunders']
+        return performance
+    
 # Training Recommendations System
+PRIORITY = {'high': 3, 'medium': 2, 'low': 1}
+
 class TrainingRecommendationEngine:
     def __init__(self):
         self.weakness_thresholds = {
@@ -393,7 +645,7 @@ class TrainingRecommendationEngine:
                 'target_improvement': '20% faster decision making'
             })
         
-        return sorted(recommendations, key=lambda x: {'high': 3, 'medium': 2, 'low': 1}[x['priority']], reverse=True)
+        return sorted(recommendations, key=lambda x: PRIORITY[x['priority']], reverse=True)
     
     def _identify_tactical_weaknesses(self, insights: Dict) -> List[str]:
         """Identify specific tactical pattern weaknesses"""
@@ -401,10 +653,57 @@ class TrainingRecommendationEngine:
         return ['pins', 'forks', 'discovered_attacks', 'deflection']
 
 # Database Operations
-async def store_game_in_db(user_id: int, game_data: Dict):
-    """Store a game in the database"""
-    # Implementation would use SQLAlchemy session
-    pass
+GAME_IMPORT_COLUMNS = (
+    'user_id', 'lichess_game_id', 'pgn', 'time_control', 'user_color', 'user_rating',
+    'opponent_rating', 'result', 'opening_eco', 'opening_name', 'played_at', 'analyzed'
+)
+
+async def store_games_in_db(user_id: int, lichess_username: str, games_data: List[Dict]) -> List[int]:
+    """Store fetched games in bulk, returning the IDs of newly stored games"""
+    if not games_data:
+        return []
+    
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for game_data in games_data:
+        is_white = game_data['white_player'].lower() == lichess_username.lower()
+        writer.writerow((
+            user_id,
+            game_data['lichess_id'],
+            game_data['pgn'],
+            game_data['time_control'],
+            'white' if is_white else 'black',
+            game_data['white_rating'] if is_white else game_data['black_rating'],
+            game_data['black_rating'] if is_white else game_data['white_rating'],
+            game_data['result'],
+            game_data['opening'].get('eco'),
+            game_data['opening'].get('name'),
+            game_data['played_at'].isoformat(),
+            False
+        ))
+    buf.seek(0)
+    
+    columns = ', '.join(GAME_IMPORT_COLUMNS)
+    
+    def write():
+        # COPY every game into a staging table in one stream, then move the
+        # new ones across with a single INSERT ... SELECT that skips games
+        # already stored and returns the sequence-assigned IDs
+        conn = engine.raw_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"CREATE TEMP TABLE games_import ON COMMIT DROP AS SELECT {columns} FROM games WITH NO DATA")
+                cur.copy_expert(f"COPY games_import ({columns}) FROM STDIN WITH (FORMAT csv)", buf)
+                cur.execute(
+                    f"INSERT INTO games ({columns}) SELECT {columns} FROM games_import "
+                    "ON CONFLICT (lichess_game_id) DO NOTHING RETURNING id"
+                )
+                game_ids = [row[0] for row in cur.fetchall()]
+            conn.commit()
+            return game_ids
+        finally:
+            conn.close()
+    return await asyncio.to_thread(write)
 
 async def get_game_by_id(game_id: int) -> Game:
     """Retrieve a game by ID"""
@@ -413,8 +712,16 @@ async def get_game_by_id(game_id: int) -> Game:
 
 async def store_analysis_results(game_id: int, analysis_results: List[Dict]):
     """Store game analysis results"""
-    # Implementation would bulk insert analysis data
-    pass
+    if not analysis_results:
+        return
+    
+    rows = [{'game_id': game_id, **result} for result in analysis_results]
+    
+    def write():
+        # One executemany INSERT for the whole game, in a single transaction
+        with SessionLocal.begin() as db:
+            db.execute(insert(GameAnalysis), rows)
+    await asyncio.to_thread(write)
 
 async def mark_game_analyzed(game_id: int):
     """Mark a game as analyzed"""
@@ -423,34 +730,29 @@ async def mark_game_analyzed(game_id: int):
 
 async def update_analysis_progress(user_id: int, game_id: int, status: str):
     """Update analysis progress in Redis"""
-    redis_client = redis.Redis()
     progress_key = f"analysis_progress:{user_id}"
     
-    current_progress = redis_client.hgetall(progress_key)
-    games_total = int(current_progress.get(b'games_total', 0))
-    games_completed = int(current_progress.get(b'games_completed', 0))
-    
-    if status == 'completed':
-        games_completed += 1
-    
-    redis_client.hset(progress_key, mapping={
-        'games_total': games_total,
-        'games_completed': games_completed,
-        'percentage': (games_completed / games_total * 100) if games_total > 0 else 0,
-        'current_game': game_id,
-        'status': status,
-        'updated_at': datetime.utcnow().isoformat()
-    })
-    
-    redis_client.expire(progress_key, 86400)  # 24 hours
+    # Increment in place rather than read-modify-write, so the whole
+    # update goes out in one round trip; percentage is derived on read
+    async with REDIS.pipeline(transaction=False) as pipe:
+        pipe.hincrby(progress_key, 'games_completed', 1 if status == 'completed' else 0)
+        pipe.hset(progress_key, mapping={
+            'current_game': game_id,
+            'status': status,
+            'updated_at': iso_now()
+        })
+        pipe.expire(progress_key, 86400)  # 24 hours
+        await pipe.execute()
 
 # FastAPI Application
-from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 import bcrypt
 
-app = FastAPI(title="Chess Analysis Platform API")
+app = FastAPI(title="Chess Analysis Platform API", default_response_class=ORJSONResponse)
 security = HTTPBearer()
 
 # Pydantic Models
@@ -471,10 +773,12 @@ class AnalysisStatus(BaseModel):
     estimated_completion: Optional[str] = None
 
 # Authentication
+TOKEN_CACHE_TTL = 60  # seconds
+
 class AuthService:
     def __init__(self, secret_key: str = "your-secret-key"):
         self.secret_key = secret_key
-        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=12)
     
     def hash_password(self, password: str) -> str:
         return self.pwd_context.hash(password)
@@ -490,24 +794,47 @@ class AuthService:
             return jwt.decode(token, self.secret_key, algorithms=["HS256"])
         except jwt.InvalidTokenError:
             raise HTTPException(status_code=401, detail="Invalid token")
+    
+    async def verify_token_cached(self, token: str) -> dict:
+        """Verify a token, reusing the decoded payload for repeat requests"""
+        key = f"jwt:{hashlib.blake2b(token.encode(), digest_size=16).hexdigest()}"
+        try:
+            cached = await REDIS.get(key)
+        except aioredis.RedisError:
+            # The cache is only a shortcut; verify directly while Redis is down
+            return self.verify_token(token)
+        if cached:
+            return msgpack.unpackb(cached)
+        
+        payload = self.verify_token(token)
+        # Never cache a payload past the token's own expiry
+        ttl = TOKEN_CACHE_TTL
+        if 'exp' in payload:
+            ttl = min(ttl, int(payload['exp'] - time.time()))
+        if ttl > 0:
+            try:
+                await REDIS.setex(key, ttl, msgpack.packb(payload))
+            except aioredis.RedisError:
+                pass
+        return payload
 
 auth_service = AuthService()
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Get current authenticated user"""
     try:
-        payload = auth_service.verify_token(credentials.credentials)
+        payload = await auth_service.verify_token_cached(credentials.credentials)
         return payload
-    except:
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid authentication")
 
 # API Endpoints
 @app.post("/auth/register")
-async def register_user(user_data: UserRegistration, background_tasks: BackgroundTasks):
+async def register_user(user_data: UserRegistration):
     """Register a new user and start game analysis"""
     try:
-        # Hash password
-        password_hash = auth_service.hash_password(user_data.password)
+        # Hash password; bcrypt is CPU-bound, so keep it off the event loop
+        password_hash = await run_in_threadpool(auth_service.hash_password, user_data.password)
         
         # Create user (implementation would save to database)
         user_id = await create_user_in_db(
@@ -517,7 +844,7 @@ async def register_user(user_data: UserRegistration, background_tasks: Backgroun
         )
         
         # Start background game fetching and analysis
-        background_tasks.add_task(fetch_and_store_games, user_id, user_data.lichess_username)
+        fetch_and_store_games.delay(user_id, user_data.lichess_username)
         
         # Create access token
         token = auth_service.create_token({"user_id": user_id, "email": user_data.email})
@@ -536,7 +863,7 @@ async def login_user(user_data: UserLogin):
     """Authenticate user and return token"""
     user = await get_user_by_email(user_data.email)
     
-    if not user or not auth_service.verify_password(user_data.password, user.password_hash):
+    if not user or not await run_in_threadpool(auth_service.verify_password, user_data.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     token = auth_service.create_token({"user_id": user.id, "email": user.email})
@@ -551,17 +878,16 @@ async def login_user(user_data: UserLogin):
 async def get_analysis_status(current_user: dict = Depends(get_current_user)):
     """Get current analysis progress"""
     user_id = current_user["user_id"]
-    redis_client = redis.Redis()
     progress_key = f"analysis_progress:{user_id}"
     
-    progress_data = redis_client.hgetall(progress_key)
+    progress_data = await REDIS.hgetall(progress_key)
     
     if not progress_data:
         return {"status": "no_analysis_running", "message": "No analysis in progress"}
     
     games_total = int(progress_data.get(b'games_total', 0))
     games_completed = int(progress_data.get(b'games_completed', 0))
-    percentage = float(progress_data.get(b'percentage', 0))
+    percentage = (games_completed / games_total * 100) if games_total > 0 else 0
     
     # Estimate completion time
     if percentage > 0 and percentage < 100:
@@ -598,11 +924,13 @@ async def get_user_insights(current_user: dict = Depends(get_current_user)):
     insights_generator = InsightsGenerator()
     insights = await insights_generator.generate_user_insights(user_id)
     
-    return {
+    # Returned directly so the large payload skips jsonable_encoder;
+    # orjson serializes it, NumPy values included, in one pass
+    return ORJSONResponse({
         "insights_available": True,
         "data": insights,
-        "generated_at": datetime.utcnow().isoformat()
-    }
+        "generated_at": iso_now()
+    })
 
 @app.get("/recommendations")
 async def get_training_recommendations(current_user: dict = Depends(get_current_user)):
@@ -615,7 +943,7 @@ async def get_training_recommendations(current_user: dict = Depends(get_current_
     return {
         "recommendations": recommendations,
         "total_count": len(recommendations),
-        "generated_at": datetime.utcnow().isoformat()
+        "generated_at": iso_now()
     }
 
 @app.get("/games/{game_id}/analysis")
@@ -628,7 +956,7 @@ async def get_game_analysis(game_id: int, current_user: dict = Depends(get_curre
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
     
-    return {
+    return ORJSONResponse({
         "game_info": {
             "id": game.id,
             "lichess_id": game.lichess_game_id,
@@ -645,20 +973,17 @@ async def get_game_analysis(game_id: int, current_user: dict = Depends(get_curre
                 "best_move": a.best_move,
                 "evaluation": a.stockfish_eval,
                 "eval_loss": a.eval_loss,
-                "quality": a.move_quality,
+                "quality": MoveQuality(a.move_quality).label,
                 "time_spent": a.time_spent,
                 "phase": a.game_phase
             }
             for a in game.analysis
         ],
         "summary": await generate_game_summary(game)
-    }
+    })
 
 @app.post("/games/reanalyze")
-async def reanalyze_games(
-    background_tasks: BackgroundTasks,
-    current_user: dict = Depends(get_current_user)
-):
+async def reanalyze_games(current_user: dict = Depends(get_current_user)):
     """Trigger re-analysis of user's games"""
     user_id = current_user["user_id"]
     
@@ -670,7 +995,7 @@ async def reanalyze_games(
     
     # Trigger re-analysis
     for game_id in game_ids:
-        background_tasks.add_task(analyze_game_task, game_id)
+        analyze_game_task.delay(game_id)
     
     return {
         "message": f"Re-analysis started for {len(game_ids)} games",
@@ -704,9 +1029,9 @@ async def generate_game_summary(game: Game) -> Dict:
         return {}
     
     total_moves = len(game.analysis)
-    blunders = sum(1 for a in game.analysis if a.move_quality == 'blunder')
-    mistakes = sum(1 for a in game.analysis if a.move_quality == 'mistake')
-    inaccuracies = sum(1 for a in game.analysis if a.move_quality == 'inaccuracy')
+    blunders = sum(1 for a in game.analysis if a.move_quality == MoveQuality.BLUNDER)
+    mistakes = sum(1 for a in game.analysis if a.move_quality == MoveQuality.MISTAKE)
+    inaccuracies = sum(1 for a in game.analysis if a.move_quality == MoveQuality.INACCURACY)
     
     avg_eval_loss = sum(a.eval_loss for a in game.analysis) / total_moves
     
@@ -729,10 +1054,50 @@ async def clear_user_analysis(user_id: int):
     # Implementation would delete analysis records
     pass
 
-async def get_user_games_with_analysis(user_id: int) -> List[Game]:
-    """Get user games with analysis data"""
-    # Implementation would query database
-    return []
+async def get_user_games(user_id: int) -> List[Game]:
+    """Get a user's games without their PGN or analysis rows"""
+    def query():
+        with SessionLocal() as db:
+            return db.scalars(
+                select(Game).where(Game.user_id == user_id).options(defer(Game.pgn))
+            ).all()
+    return await asyncio.to_thread(query)
+
+async def get_user_move_stats(user_id: int) -> Dict[str, Dict]:
+    """Aggregate a user's analyzed moves per game phase and overall in a single query"""
+    def query():
+        with SessionLocal() as db:
+            # ROLLUP adds a grand-total row alongside the per-phase rows;
+            # GROUPING() tells it apart from moves with no phase recorded
+            rows = db.execute(
+                select(
+                    GameAnalysis.game_phase,
+                    func.grouping(GameAnalysis.game_phase).label('is_total'),
+                    func.count(GameAnalysis.game_id.distinct()).label('games'),
+                    func.count().label('moves'),
+                    func.avg(GameAnalysis.eval_loss).label('avg_eval_loss'),
+                    func.avg(func.greatest(0, 100 - GameAnalysis.eval_loss / 2)).label('accuracy'),
+                    func.count().filter(GameAnalysis.move_quality == MoveQuality.BLUNDER).label('blunders'),
+                    func.count().filter(GameAnalysis.move_quality == MoveQuality.MISTAKE).label('mistakes'),
+                    func.count().filter(GameAnalysis.move_quality == MoveQuality.INACCURACY).label('inaccuracies'),
+                )
+                .join(Game, Game.id == GameAnalysis.game_id)
+                .where(Game.user_id == user_id, Game.analyzed.is_(True))
+                .group_by(func.rollup(GameAnalysis.game_phase))
+            ).all()
+        return {
+            'overall' if row.is_total else row.game_phase: {
+                'games': row.games,
+                'moves': row.moves,
+                'avg_eval_loss': float(row.avg_eval_loss or 0),
+                'accuracy': float(row.accuracy or 0),
+                'blunders': row.blunders,
+                'mistakes': row.mistakes,
+                'inaccuracies': row.inaccuracies
+            }
+            for row in rows
+        }
+    return await asyncio.to_thread(query)
 
 async def get_user_profile(user_id: int):
     """Get user profile information"""
@@ -0,0 +1,115 @@
+import asyncio
+import io
+
+import chess.pgn
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.database.database import Base
+from app.database.models import Game, GameAnalysis, User
+from app.services import analysis_service
+from app.services.analysis_service import ChessAnalysisEngine, MainlineGameBuilder
+
+
+PGN_WITH_VARIATIONS = """[Event "Casual game"]
+[White "alice"]
+[Black "bob"]
+[Result "*"]
+
+1. e4 { [%clk 0:05:00] } (1. d4 d5 (1... Nf6) 2. c4) e5 { [%clk 0:04:58] } 2. Nf3 (2. f4 exf4) Nc6 *
+"""
+
+
+def test_mainline_builder_skips_variations_and_comments():
+    game = chess.pgn.read_game(io.StringIO(PGN_WITH_VARIATIONS), Visitor=MainlineGameBuilder)
+    
+    assert [move.uci() for move in game.mainline_moves()] == ["e2e4", "e7e5", "g1f3", "b8c6"]
+    assert all(len(node.variations) <= 1 for node in game.mainline())
+    assert all(not node.comment for node in game.mainline())
+    assert game.headers["White"] == "alice"
+
+
+@pytest.mark.parametrize("eval_loss, quality", [
+    (0, "excellent"),
+    (10, "excellent"),
+    (10.01, "good"),
+    (25, "good"),
+    (26, "inaccuracy"),
+    (50, "inaccuracy"),
+    (51, "mistake"),
+    (100, "mistake"),
+    (100.5, "blunder"),
+    (10000, "blunder"),
+])
+def test_move_quality_thresholds_are_inclusive(eval_loss, quality):
+    assert ChessAnalysisEngine()._categorize_move_quality(eval_loss) == quality
+
+
+def _seed_analyzed_game(session_factory):
+    async def seed():
+        async with session_factory() as db:
+            user = User(email="alice@example.com", lichess_username="alice", password_hash="x")
+            db.add(user)
+            await db.flush()
+            game = Game(user_id=user.id, lichess_game_id="abcd1234", pgn="1. e4 e5 *", analyzed=True)
+            db.add(game)
+            await db.flush()
+            db.add_all([
+                GameAnalysis(game_id=game.id, move_number=1, position_fen="-", move_played="e2e4",
+                             eval_loss=5, move_quality="excellent", game_phase="opening"),
+                GameAnalysis(game_id=game.id, move_number=2, position_fen="-", move_played="e7e5",
+                             eval_loss=80, move_quality="mistake", game_phase="opening"),
+                GameAnalysis(game_id=game.id, move_number=3, position_fen="-", move_played="g1f3",
+                             eval_loss=200, move_quality="blunder", game_phase="opening"),
+            ])
+            await db.commit()
+            return user.id, game.id
+    return seed()
+
+
+def test_game_analysis_summary_aggregates_and_reuses_cached_analysis(monkeypatch):
+    cache = {}
+    
+    async def fake_get_cache(key):
+        return cache.get(key)
+    
+    async def fake_set_cache(key, value, expire=3600):
+        cache[key] = value
+        return True
+    
+    monkeypatch.setattr(analysis_service, "aget_cache", fake_get_cache)
+    monkeypatch.setattr(analysis_service, "aset_cache", fake_set_cache)
+    
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        user_id, game_id = await _seed_analyzed_game(session_factory)
+        
+        async with session_factory() as db:
+            summary = await analysis_service.get_game_analysis_summary(game_id, user_id, db)
+            assert await analysis_service.get_game_analysis_summary(game_id, user_id + 1, db) is None
+            
+            # Populates the cache the summary endpoint reads from
+            analysis = await analysis_service.get_game_analysis(game_id, user_id, db)
+        
+        await engine.dispose()
+        
+        # Served from the cache: no session is needed at all
+        cached_summary = await analysis_service.get_game_analysis_summary(game_id, user_id, None)
+        return summary, analysis, cached_summary
+    
+    summary, analysis, cached_summary = asyncio.run(run())
+    
+    assert summary["summary"] == {
+        "total_moves": 3,
+        "blunders": 1,
+        "mistakes": 1,
+        "inaccuracies": 0,
+        "average_eval_loss": 95.0,
+        "accuracy_score": 52.5,
+    }
+    assert summary["game_info"]["lichess_id"] == "abcd1234"
+    assert [move["move_number"] for move in analysis["analysis"]] == [1, 2, 3]
+    assert cached_summary == summary
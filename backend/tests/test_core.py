@@ -0,0 +1,45 @@
+import random
+
+import chess
+import chess.polyglot
+import pytest
+
+from core import pack_position, unpack_position
+
+
+def _random_positions(count: int, seed: int = 1234):
+    rng = random.Random(seed)
+    for _ in range(count):
+        board = chess.Board()
+        for _ in range(rng.randint(0, 120)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        yield board
+
+
+@pytest.mark.parametrize("fen", [
+    chess.STARTING_FEN,
+    "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3",  # en passant square
+    "r3k2r/8/8/8/8/8/8/R3K2R b Kq - 0 1",  # partial castling rights, black to move
+    "8/8/8/4k3/8/8/8/4K3 w - - 0 1",  # odd piece count
+])
+def test_pack_position_round_trips(fen):
+    board = chess.Board(fen)
+    packed = pack_position(board)
+    restored = unpack_position(packed)
+    
+    assert len(packed) <= 32
+    assert restored.board_fen() == board.board_fen()
+    assert restored.turn == board.turn
+    assert restored.castling_rights == board.castling_rights
+    assert restored.ep_square == board.ep_square
+
+
+def test_pack_position_round_trips_random_games():
+    for board in _random_positions(200):
+        restored = unpack_position(pack_position(board))
+        # Move counters aren't stored; everything else about the position is
+        assert restored.fen().split()[:4] == board.fen().split()[:4]
+        assert chess.polyglot.zobrist_hash(restored) == chess.polyglot.zobrist_hash(board)
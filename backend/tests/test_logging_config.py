@@ -0,0 +1,27 @@
+import logging
+import sys
+
+import orjson
+import structlog
+from celery.utils.log import LoggingProxy
+
+from app.core.logging_config import configure_structlog
+
+
+def test_structlog_writes_through_celery_stdout_proxy(monkeypatch, caplog):
+    proxy_logger = logging.getLogger("tests.celery.stdout")
+    monkeypatch.setattr(sys, "stdout", LoggingProxy(proxy_logger, loglevel=logging.WARNING))
+    
+    configure_structlog(logging.INFO)
+    try:
+        with caplog.at_level(logging.WARNING, logger=proxy_logger.name):
+            structlog.get_logger().info("Completed engine analysis", game_id=7)
+    finally:
+        structlog.reset_defaults()
+    
+    records = [r for r in caplog.records if r.name == proxy_logger.name]
+    assert len(records) == 1
+    entry = orjson.loads(records[0].getMessage())
+    assert entry["event"] == "Completed engine analysis"
+    assert entry["game_id"] == 7
+    assert entry["level"] == "info"
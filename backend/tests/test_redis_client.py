@@ -0,0 +1,65 @@
+import pytest
+import redis
+
+from app.core import redis_client as progress
+
+
+@pytest.fixture
+def user_id():
+    """A user whose progress key is removed again; skips without a Redis server"""
+    try:
+        progress.redis_client.ping()
+    except redis.RedisError:
+        pytest.skip("Redis server not available")
+    
+    user_id = 987654321
+    progress.clear_analysis_progress(user_id)
+    yield user_id
+    progress.clear_analysis_progress(user_id)
+
+
+def test_updates_merge_into_existing_progress(user_id):
+    progress.update_analysis_progress(user_id, {'status': 'analyzing', 'games_total': 4, 'games_completed': 0})
+    progress.update_analysis_progress(user_id, {'current_game': 17})
+    
+    assert progress.get_analysis_progress(user_id) == {
+        'status': 'analyzing',
+        'games_total': 4,
+        'games_completed': 0,
+        'current_game': 17,
+    }
+    assert 0 < progress.redis_client.ttl(f"analysis_progress:{user_id}") <= progress.ANALYSIS_PROGRESS_TTL
+
+
+def test_none_clears_a_field(user_id):
+    progress.update_analysis_progress(user_id, {'status': 'failed', 'error_message': 'boom'})
+    progress.update_analysis_progress(user_id, {'status': 'analyzing', 'error_message': None})
+    
+    assert progress.get_analysis_progress(user_id) == {'status': 'analyzing'}
+
+
+def test_increments_recompute_percentage_and_complete_the_run(user_id):
+    progress.update_analysis_progress(user_id, {
+        'status': 'analyzing', 'games_total': 3, 'games_completed': 0, 'games_failed': 0, 'percentage': 0
+    })
+    
+    progress.update_analysis_progress(user_id, {}, increments={'games_completed': 1})
+    state = progress.get_analysis_progress(user_id)
+    assert state['games_completed'] == 1
+    assert state['percentage'] == 33.3
+    assert state['status'] == 'analyzing'
+    
+    progress.update_analysis_progress(user_id, {}, increments={'games_completed': 1, 'games_failed': 1})
+    state = progress.get_analysis_progress(user_id)
+    assert (state['games_completed'], state['games_failed']) == (2, 1)
+    assert state['percentage'] == 100
+    assert state['status'] == 'completed'
+
+
+def test_pipeline_update_is_only_sent_on_execute(user_id):
+    pipe = progress.redis_client.pipeline()
+    progress.update_analysis_progress(user_id, {'status': 'analyzing'}, pipe=pipe)
+    assert progress.get_analysis_progress(user_id) is None
+    
+    pipe.execute()
+    assert progress.get_analysis_progress(user_id) == {'status': 'analyzing'}
@@ -0,0 +1,45 @@
+import time
+from datetime import timedelta
+
+import bcrypt
+import jwt
+
+from app.config import settings
+from app.core.security import create_access_token, verify_and_update_password, verify_token
+
+
+def test_legacy_bcrypt_hash_verifies_and_is_rehashed():
+    legacy_hash = bcrypt.hashpw(b"correct horse", bcrypt.gensalt(rounds=4, prefix=b"2b")).decode()
+    assert legacy_hash.startswith("$2b$")
+    
+    valid, new_hash = verify_and_update_password("correct horse", legacy_hash)
+    
+    assert valid
+    assert new_hash is not None and new_hash.startswith("$argon2id$")
+    assert verify_and_update_password("correct horse", new_hash) == (True, None)
+
+
+def test_legacy_bcrypt_hash_rejects_wrong_password():
+    legacy_hash = bcrypt.hashpw(b"correct horse", bcrypt.gensalt(rounds=4, prefix=b"2b")).decode()
+    
+    assert verify_and_update_password("wrong", legacy_hash) == (False, None)
+
+
+def test_hs256_token_round_trips_through_pyjwt():
+    token = create_access_token({"user_id": 42, "email": "alice@example.com"})
+    
+    payload = jwt.decode(token, settings.secret_key, algorithms=["HS256"])
+    assert payload["user_id"] == 42
+    assert payload["email"] == "alice@example.com"
+    assert payload["exp"] > time.time()
+    assert jwt.get_unverified_header(token) == {"alg": "HS256", "typ": "JWT"}
+    assert verify_token(token) == payload
+
+
+def test_tampered_or_expired_tokens_are_rejected():
+    token = create_access_token({"user_id": 42, "email": "alice@example.com"})
+    header, payload, signature = token.split(".")
+    forged = jwt.encode({"user_id": 1, "email": "mallory@example.com"}, "not-the-secret", algorithm="HS256")
+    
+    assert verify_token(f"{header}.{forged.split('.')[1]}.{signature}") is None
+    assert verify_token(create_access_token({"user_id": 42}, expires_delta=timedelta(seconds=-1))) is None